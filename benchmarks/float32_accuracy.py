@@ -0,0 +1,104 @@
+"""
+measure the accuracy of the float32 precision of score_batch against float64
+
+A population is generated by perturbing every electrical and anthropometric
+reading of bia_sample.json (uniformly within +/- the given spread) and by
+drawing random genders and ages. The batch is scored in both precisions and
+the maximum absolute and relative error of every measure is reported. The
+script fails if any measure exceeds its bounds in checkupy.FLOAT32_TOLERANCE.
+
+usage:
+    python benchmarks/float32_accuracy.py --rows 200000
+"""
+
+#! IMPORTS
+
+
+import argparse
+import json
+import os
+import sys
+from os.path import dirname, join
+
+import numpy as np
+import pandas as pd
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+SAMPLE = join(ROOT, "bia_sample.json")
+sys.path.insert(0, ROOT)
+
+from checkupy import FLOAT32_TOLERANCE, score_batch
+
+
+#! FUNCTIONS
+
+
+def population(rows: int, spread: float, seed: int):
+    """return a random population of measurements around the sample"""
+    with open(SAMPLE, "r") as f:
+        params = json.load(f)
+    rng = np.random.default_rng(seed)
+    data = {}
+    for key, value in params.items():
+        if key != "gender":
+            data[key] = value * rng.uniform(1 - spread, 1 + spread, rows)
+    data["gender"] = rng.choice(["M", "F"], rows)
+    data["age"] = rng.integers(18, 80, rows)
+    data["height"] = rng.integers(150, 200, rows)
+    return pd.DataFrame(data)
+
+
+def errors(rows: int, spread: float, seed: int):
+    """return the float32 errors of each measure"""
+    data = population(rows, spread, seed)
+    double = score_batch(data)
+    single = score_batch(data, precision="float32")
+    columns = double.select_dtypes("number").columns
+    x64 = double[columns].to_numpy(dtype=float)
+    x32 = single[columns].to_numpy(dtype=float)
+    available = ~np.isnan(x64).all(axis=0)
+    x64, x32, columns = x64[:, available], x32[:, available], columns[available]
+    err = np.abs(x32 - x64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel = np.where(x64 != 0, err / np.abs(x64), 0.0)
+    tolerance = [FLOAT32_TOLERANCE[i] for i in columns.get_level_values(1)]
+    rtol = np.array([i["rtol"] for i in tolerance])
+    atol = np.array([i["atol"] for i in tolerance])
+    bound = atol + rtol * np.abs(x64)
+    out = pd.DataFrame(
+        {
+            "max_abs_error": np.nanmax(err, axis=0),
+            "max_rel_error": np.nanmax(rel, axis=0),
+            "rtol": rtol,
+            "atol": atol,
+            "bound_usage": np.nanmax(err / bound, axis=0),
+        },
+        index=columns,
+    )
+    memory = dict(
+        float64=double.memory_usage(deep=False).sum(),
+        float32=single.memory_usage(deep=False).sum(),
+    )
+    return out, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--spread", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    table, memory = errors(args.rows, args.spread, args.seed)
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(table.sort_values("bound_usage", ascending=False).to_string())
+    print(f"\nworst bound usage: {table['bound_usage'].max():.3f}")
+    for key, value in memory.items():
+        print(f"output memory ({key}): {value / 2**20:.1f} MB")
+    if (table["bound_usage"] > 1).any():
+        print("FAILED: some measures exceed the float32 tolerance")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+measure the memory footprint of checkupy
+
+Each figure is measured in a fresh interpreter, so that the results do not
+depend on what was loaded before:
+
+    import_*: the memory added by importing numpy, pandas, onnx,
+        onnxruntime and checkupy (in this order)
+    inbody_session: the memory of the shared Inbody inference session
+    checkup_object: the memory retained by each CheckupBIA object once all
+        its measures have been computed
+    bulk_<N>: the peak memory of score_batch over N rows
+
+Python allocations are traced with tracemalloc (numpy buffers included),
+while the resident set size (RSS) is sampled every millisecond by a
+background thread in a separate run, so that the native allocations of
+onnxruntime are accounted for as well. With --baseline the figures are
+compared with a previous --output file and the script fails if any of them
+grows by more than --tolerance.
+
+usage:
+    python benchmarks/memory.py --output memory.json
+    python benchmarks/memory.py --baseline memory.json --tolerance 0.1
+"""
+
+#! IMPORTS
+
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from os.path import dirname, join
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+SAMPLE = join(ROOT, "bia_sample.json")
+
+# the modules whose import footprint is measured, in import order
+MODULES = ["numpy", "pandas", "onnx", "onnxruntime", "checkupy"]
+
+# the number of CheckupBIA objects used to measure the size of each one
+N_OBJECTS = 200
+
+# figures smaller than this (bytes) are not checked against the baseline.
+# checkup_object is a per-object figure (about 9 kB), hence its own floor
+MIN_CHECKED = dict(checkup_object=1 << 10)
+DEFAULT_MIN_CHECKED = 1 << 20
+
+
+#! FUNCTIONS
+
+
+def rss():
+    """return the resident set size of the process in bytes"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # not Linux: fall back to the peak RSS
+        import resource
+
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+class RSSSampler:
+    """context manager sampling the peak RSS from a background thread"""
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.start = 0
+        self.peak = 0
+        self.end = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        gc.collect()
+        self.start = self.peak = rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+        gc.collect()
+        self.end = rss()
+        self.peak = max(self.peak, self.end)
+
+
+def measure(func, traced: bool):
+    """
+    run func measuring its memory
+
+    Parameters
+    ----------
+    func: callable
+        the measured function
+
+    traced: bool
+        if True, the Python allocations are traced with tracemalloc,
+        otherwise the RSS is sampled (tracemalloc bookkeeping would inflate
+        the RSS, hence the two are never measured in the same run)
+
+    Returns
+    -------
+    figures: dict[str, int]
+        traced, traced_peak: the Python memory retained after the call and
+            its peak during the call
+        rss, rss_peak: the RSS retained after the call and its peak during
+            the call
+        (all in bytes, relative to the state before the call)
+    """
+    # the result is kept alive until the figures are read, so that the memory
+    # it retains (e.g. the CheckupBIA objects) is accounted for
+    if traced:
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        return dict(traced=current - base, traced_peak=peak - base)
+    with RSSSampler() as sampler:
+        result = func()
+    del result
+    return dict(rss=sampler.end - sampler.start, rss_peak=sampler.peak - sampler.start)
+
+
+def run_case(case: str, traced: bool):
+    """measure a single case in the current (fresh) interpreter"""
+    sys.path.insert(0, ROOT)
+    if case.startswith("import_"):
+        module = case.split("_", 1)[1]
+        for i in MODULES[: MODULES.index(module)]:
+            __import__(i)
+        return measure(lambda: __import__(module), traced)
+
+    import pandas as pd
+
+    from checkupy import CheckupBIA, score_batch
+    from checkupy.checkupy import Inbody
+
+    with open(SAMPLE, "r") as f:
+        params = json.load(f)
+
+    if case == "inbody_session":
+        return measure(Inbody.get_model, traced)
+
+    Inbody.get_model()
+    CheckupBIA(**params).to_dict()  # warm-up of the code paths
+
+    if case == "checkup_object":
+
+        def build():
+            out = []
+            for _ in range(N_OBJECTS):
+                obj = CheckupBIA(**params)
+                obj.to_dict()
+                out.append(obj)
+            return out
+
+        return {k: v // N_OBJECTS for k, v in measure(build, traced).items()}
+
+    if case.startswith("bulk_"):
+        rows = int(case.split("_")[1])
+        data = pd.DataFrame([params] * rows)
+        return measure(lambda: score_batch(data), traced)
+
+    raise ValueError(f"Unknown case: {case}")
+
+
+def run_all(bulk_sizes: list[int]):
+    """measure every case in its own interpreter"""
+    cases = [f"import_{i}" for i in MODULES]
+    cases += ["inbody_session", "checkup_object"]
+    cases += [f"bulk_{i}" for i in bulk_sizes]
+    results = {}
+    for case in cases:
+        results[case] = {}
+        for mode in ["rss", "traced"]:
+            cmd = [sys.executable, __file__, "--case", case, "--mode", mode]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True)
+            results[case].update(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def unit(case: str):
+    """return the unit and its size in bytes used to print a case"""
+    return ("kB", 1024) if case == "checkup_object" else ("MB", 2**20)
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """return the figures grown by more than tolerance over the baseline"""
+    regressions = []
+    for case, figures in results.items():
+        floor = MIN_CHECKED.get(case, DEFAULT_MIN_CHECKED)
+        for key, value in figures.items():
+            old = baseline.get(case, {}).get(key)
+            if old is None or max(old, value) < floor:
+                continue
+            if value > max(old, 0) * (1 + tolerance) + floor * tolerance:
+                regressions.append((case, key, old, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--bulk", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--output", type=str, help="save the results as json")
+    parser.add_argument("--baseline", type=str, help="json results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--case", type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=["rss", "traced"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # child interpreter: run a single case and print the results as json
+    if args.case is not None:
+        print(json.dumps(run_case(args.case, args.mode == "traced")))
+        return
+
+    results = run_all(args.bulk)
+    print(f"{'case':18s} {'rss':>10s} {'rss_peak':>10s} {'traced':>10s} {'peak':>10s}")
+    for case, v in results.items():
+        name, scale = unit(case)
+        values = [v["rss"], v["rss_peak"], v["traced"], v["traced_peak"]]
+        print(f"{case:18s} " + " ".join(f"{i / scale:7.1f} {name}" for i in values))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for case, key, old, new in regressions:
+            name, scale = unit(case)
+            change = f"{old / scale:.1f} {name} -> {new / scale:.1f} {name}"
+            print(f"REGRESSION {case}.{key}: {change}")
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+measure the overhead of the metrics updated on the hot paths
+
+A single-subject checkup and a batch checkup are timed with the metrics
+enabled and disabled (alternating the two modes to cancel the drift of the
+host), together with the cost of a single counter and histogram update. As
+the difference of the two timings is dominated by noise on busy hosts, the
+overhead is also estimated as the number of metric updates of a checkup
+times their unit cost. The script fails if this estimate exceeds the given
+fraction of the single checkup time.
+
+usage:
+    python benchmarks/metrics_overhead.py --repeat 200 --threshold 0.05
+"""
+
+#! IMPORTS
+
+
+import argparse
+import json
+import os
+import sys
+from os.path import dirname, join
+from time import perf_counter
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+SAMPLE = join(ROOT, "bia_sample.json")
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+from checkupy import CheckupBIA, default_metrics, score_batch
+from checkupy.metrics import CHECKUP_SECONDS, CHECKUPS, Counter, Histogram
+
+
+#! FUNCTIONS
+
+
+def timeit(func, repeat: int):
+    """return the median time of repeated calls of func"""
+    times = []
+    for _ in range(repeat):
+        tic = perf_counter()
+        func()
+        times.append(perf_counter() - tic)
+    return sorted(times)[len(times) // 2]
+
+
+def compare(func, repeat: int, rounds: int = 5):
+    """return the best (disabled, enabled) median times over the rounds"""
+    out = {False: [], True: []}
+    for _ in range(rounds):
+        for enabled in (False, True):
+            default_metrics.enabled = enabled
+            out[enabled].append(timeit(func, repeat))
+    default_metrics.enabled = True
+    return min(out[False]), min(out[True])
+
+
+def count_updates(func):
+    """return the number of metric updates made by a call of func"""
+    calls = [0]
+    originals = Counter.inc, Histogram.observe
+
+    def wrap(method):
+        def wrapped(*args, **kwargs):
+            calls[0] += 1
+            return method(*args, **kwargs)
+
+        return wrapped
+
+    Counter.inc, Histogram.observe = wrap(Counter.inc), wrap(Histogram.observe)
+    try:
+        func()
+    finally:
+        Counter.inc, Histogram.observe = originals
+    return calls[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--threshold", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with open(SAMPLE, "r") as f:
+        params = json.load(f)
+    batch = pd.DataFrame([params] * args.rows)
+    CheckupBIA(**params).to_dict()  # warm-up
+
+    n = 100000
+    tic = perf_counter()
+    for _ in range(n):
+        CHECKUPS.inc(method="fitness")
+    counter = (perf_counter() - tic) / n
+    tic = perf_counter()
+    for _ in range(n):
+        CHECKUP_SECONDS.observe(0.001, method="fitness")
+    histogram = (perf_counter() - tic) / n
+    print(f"counter update:   {counter * 1e6:8.3f} us")
+    print(f"histogram update: {histogram * 1e6:8.3f} us")
+
+    single = compare(lambda: CheckupBIA(**params).to_dict(), args.repeat)
+    bulk = compare(lambda: score_batch(batch), max(args.repeat // 20, 3))
+    overhead = {}
+    for name, (off, on) in [("single checkup", single), ("batch checkup", bulk)]:
+        overhead[name] = on / off - 1
+        print(
+            f"{name:15s} disabled={off * 1e3:9.3f} ms enabled={on * 1e3:9.3f} ms "
+            + f"overhead={100 * overhead[name]:+.2f}%"
+        )
+    updates = count_updates(lambda: CheckupBIA(**params).to_dict())
+    estimate = updates * max(counter, histogram) / single[0]
+    print(f"updates per single checkup: {updates}")
+    print(f"estimated overhead: {100 * estimate:.2f}%")
+    if estimate > args.threshold:
+        print("FAILED: the metrics overhead exceeds the threshold")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+check that a missing trunk reading leaves the total body measures unchanged
+
+Each trunk resistance and reactance is set to NaN on every other row of a
+synthetic population, which is scored again. The total body measures of
+every methodology do not depend on the trunk readings, hence they must keep
+their values (a NaN reading multiplied by a zero coefficient would turn them
+into NaN). The script fails if any of them changes.
+
+usage:
+    python benchmarks/missing_inputs_check.py --rows 500
+"""
+
+#! IMPORTS
+
+
+import argparse
+import os
+import sys
+from os.path import dirname
+
+import numpy as np
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from checkupy import score_batch, synthetic_population
+
+#! CONSTANTS
+
+
+TRUNK_INPUTS = [
+    f"{side}_trunk_{kind}"
+    for side in ("left", "right")
+    for kind in ("resistance", "reactance")
+]
+
+
+#! FUNCTIONS
+
+
+def check(data, corrected: bool):
+    """return the total body measures changed by each missing trunk input"""
+    base = score_batch(data, corrected_electrical_values=corrected)
+    columns = [i for i in base.columns if i[1].startswith("total_body_")]
+    report = {}
+    for field in TRUNK_INPUTS:
+        missing = data.copy()
+        missing.loc[missing.index[::2], field] = np.nan
+        scores = score_batch(missing, corrected_electrical_values=corrected)
+        report[field] = [
+            i
+            for i in columns
+            if not np.allclose(
+                base[i].to_numpy(dtype=float),
+                scores[i].to_numpy(dtype=float),
+                rtol=1e-12,
+                atol=0,
+                equal_nan=True,
+            )
+        ]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = synthetic_population(args.rows, seed=args.seed)
+    failed = False
+    for corrected in [False, True]:
+        print(f"corrected_electrical_values={corrected}")
+        for field, changed in check(data, corrected).items():
+            status = "FAIL" if len(changed) > 0 else "ok"
+            print(f"  {field:24s} changed {len(changed):3d}  {status}")
+            for method, measure in changed:
+                print(f"      changed: {method}.{measure}")
+            failed |= len(changed) > 0
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
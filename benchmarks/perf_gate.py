@@ -0,0 +1,201 @@
+"""
+performance regression gate against a committed baseline
+
+The core scenarios are measured on the current host and compared with
+benchmarks/baseline.json. A scenario regresses when it is slower than its
+baseline by more than its tolerance (a relative margin). The script prints a
+per-scenario report and exits with status 1 if any scenario regresses. Each
+latency is the fastest of several timed samples, each sample averaging a
+batch of calls, so that the figures are stable on an unchanged tree.
+
+scenarios:
+    checkup_init: latency of CheckupBIA(**params) followed by the first
+        access of each methodology, which creates its object (seconds)
+    to_dict: latency of to_dict() on a new CheckupBIA object (seconds)
+    inbody_throughput: rows per second of the Inbody model on a batch
+    cli_cold_start: wall time of "python run.py --json ... --no-daemon"
+        in a new interpreter (seconds)
+
+usage:
+    python benchmarks/perf_gate.py                 # check
+    python benchmarks/perf_gate.py --update        # store a new baseline
+"""
+
+#! IMPORTS
+
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from os.path import dirname, join
+from time import perf_counter
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+SAMPLE = join(ROOT, "bia_sample.json")
+BASELINE = join(ROOT, "benchmarks", "baseline.json")
+sys.path.insert(0, ROOT)
+
+# the default tolerance and direction of each scenario
+SCENARIOS = {
+    "checkup_init": dict(unit="s", tolerance=0.3, higher_is_better=False),
+    "to_dict": dict(unit="s", tolerance=0.3, higher_is_better=False),
+    "inbody_throughput": dict(unit="rows/s", tolerance=0.3, higher_is_better=True),
+    "cli_cold_start": dict(unit="s", tolerance=0.3, higher_is_better=False),
+}
+
+
+#! FUNCTIONS
+
+
+def timed(func, repeat: int, number: int = 1):
+    """
+    return the time of a call of func, as the minimum over repeat samples of
+    the average time of number consecutive calls. Timing batches of calls
+    and keeping the fastest one filters out the scheduling noise, which
+    only ever makes a sample slower.
+    """
+    times = []
+    for _ in range(repeat):
+        tic = perf_counter()
+        for _ in range(number):
+            func()
+        times.append((perf_counter() - tic) / number)
+    return min(times)
+
+
+def measure(repeat: int, number: int, rows: int, cold_runs: int):
+    """measure all the scenarios"""
+    import numpy as np
+
+    from checkupy import CheckupBIA
+    from checkupy.checkupy import Inbody
+
+    with open(SAMPLE, "r") as f:
+        params = json.load(f)
+    CheckupBIA(**params).to_dict()  # warm-up
+
+    def init():
+        # the methodologies are created lazily, so the constructor alone
+        # would only measure the storage of the inputs
+        checkup = CheckupBIA(**params)
+        for method in checkup.methods:
+            getattr(checkup, method)
+
+    objects = [CheckupBIA(**params) for _ in range(repeat * number)]
+    it = iter(objects)
+    out = {
+        "checkup_init": timed(init, repeat, number),
+        "to_dict": timed(lambda: next(it).to_dict(), repeat, number),
+    }
+
+    model = Inbody.get_model()
+    rng = np.random.default_rng(0)
+    data = rng.uniform(1, 100, (rows, len(model.input_labels))).astype(np.float32)
+    model.predict(data)
+    out["inbody_throughput"] = rows / timed(lambda: model.predict(data), 5)
+
+    # the daemon is disabled to measure the actual cold start
+    with tempfile.TemporaryDirectory() as tmp:
+        cmd = [
+            sys.executable,
+            join(ROOT, "run.py"),
+            "--json",
+            SAMPLE,
+            "--output",
+            join(tmp, "out.csv"),
+            "--no-daemon",
+        ]
+        out["cli_cold_start"] = timed(
+            lambda: subprocess.run(cmd, check=True, capture_output=True, cwd=ROOT),
+            cold_runs,
+        )
+    return out
+
+
+def check(results: dict, baseline: dict, scale: float):
+    """
+    compare the results with the baseline
+
+    Returns
+    -------
+    report: list[dict]
+        the scenario, baseline, current value, change and status of each
+        scenario
+    """
+    report = []
+    for name, value in results.items():
+        spec = {**SCENARIOS[name], **baseline.get(name, {})}
+        base = spec.get("value")
+        if base is None:
+            report.append(dict(name=name, base=None, value=value, change=None))
+            report[-1]["status"] = "NEW"
+            continue
+        change = value / base - 1
+        worse = -change if spec["higher_is_better"] else change
+        status = "FAIL" if worse > spec["tolerance"] * scale else "ok"
+        report.append(
+            dict(name=name, base=base, value=value, change=change, status=status)
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--baseline", type=str, default=BASELINE)
+    parser.add_argument("--update", action="store_true", help="store a new baseline")
+    parser.add_argument("--repeat", type=int, default=20, help="timed samples")
+    parser.add_argument(
+        "--number", type=int, default=20, help="calls of each timed sample"
+    )
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--cold-runs", type=int, default=5)
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiply all the tolerances (e.g. 2 on noisy CI hosts)",
+    )
+    args = parser.parse_args()
+
+    results = measure(args.repeat, args.number, args.rows, args.cold_runs)
+
+    if args.update:
+        stored = dict(
+            host=platform.node(),
+            machine=platform.machine(),
+            python=platform.python_version(),
+            created=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            scenarios={
+                i: {**SCENARIOS[i], "value": v} for i, v in results.items()
+            },
+        )
+        with open(args.baseline, "w") as f:
+            json.dump(stored, f, indent=4)
+        print(f"baseline stored in {args.baseline}")
+        return
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)["scenarios"]
+    report = check(results, baseline, args.scale)
+    print(f"{'scenario':20s} {'baseline':>14s} {'current':>14s} {'change':>9s} status")
+    for i in report:
+        unit = SCENARIOS[i["name"]]["unit"]
+        base = "-" if i["base"] is None else f"{i['base']:.4g}"
+        change = "-" if i["change"] is None else f"{100 * i['change']:+.1f}%"
+        print(
+            f"{i['name']:20s} {base:>14s} {i['value']:14.4g} {change:>9s} "
+            + f"{i['status']} ({unit})"
+        )
+    failed = [i["name"] for i in report if i["status"] == "FAIL"]
+    if len(failed) > 0:
+        print(f"\nPERFORMANCE REGRESSION in: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+measure the unique set size (USS) of pre-forked workers with and without
+checkupy.prefork()
+
+Each mode runs in a fresh interpreter which forks N workers. Every worker
+computes a checkup and reports its USS (the memory pages it does not share
+with any other process), read from /proc/<pid>/smaps_rollup (Linux only).
+The script fails if prefork() does not reduce the USS of the workers.
+
+usage:
+    python benchmarks/prefork_uss.py --workers 4
+"""
+
+#! IMPORTS
+
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from os.path import dirname, join
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+SAMPLE = join(ROOT, "bia_sample.json")
+
+
+#! FUNCTIONS
+
+
+def uss_kb(pid: int | str = "self"):
+    """return the unique set size of the process in kB"""
+    out = 0
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                out += int(line.split()[1])
+    return out
+
+
+def worker(params: dict, write_fd: int):
+    """compute a checkup and report the unique set size of the process"""
+    from checkupy import CheckupBIA
+
+    CheckupBIA(**params).to_dict()
+    os.write(write_fd, f"{uss_kb()}\n".encode())
+    os._exit(0)
+
+
+def run_mode(mode: str, workers: int):
+    """fork the workers in the current process and return their USS"""
+    with open(SAMPLE, "r") as f:
+        params = json.load(f)
+    if mode == "prefork":
+        from checkupy.prefork import prefork
+
+        prefork()
+    read_fd, write_fd = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            worker(params, write_fd)
+        pids.append(pid)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "r") as f:
+        values = [int(i) for i in f.read().split()]
+    for pid in pids:
+        os.waitpid(pid, 0)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--mode", choices=["cold", "prefork"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # child interpreter: run a single mode and print the results as json
+    if args.mode is not None:
+        sys.path.insert(0, ROOT)
+        print(json.dumps(run_mode(args.mode, args.workers)))
+        return
+
+    results = {}
+    for mode in ["cold", "prefork"]:
+        cmd = [sys.executable, __file__, "--mode", mode, "--workers", str(args.workers)]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(f"USS per worker ({args.workers} workers, kB)")
+    for mode, values in results.items():
+        mean = sum(values) / len(values)
+        print(f"  {mode:8s} mean={mean:10.0f} max={max(values):10d}")
+    cold = sum(results["cold"]) / len(results["cold"])
+    pre = sum(results["prefork"]) / len(results["prefork"])
+    print(f"  reduction: {100 * (1 - pre / cold):.1f}%")
+    if pre >= cold:
+        print("FAILED: prefork() does not reduce the workers USS")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+check that the measure fingerprints track the actual dependencies
+
+Each orthostatic correction coefficient and each entry of the coefficient
+tables (e.g. Fitness._linear_coefficients) is perturbed in turn and a
+synthetic population is scored again. Every measure whose values change must also
+change its fingerprint, otherwise re-scoring stored results would silently
+keep outdated columns. Measures whose fingerprint changes while their values
+do not are reported as over-invalidated (harmless, but they are recomputed
+for nothing). The script fails if any measure is missed.
+
+usage:
+    python benchmarks/versioning_check.py --rows 500
+"""
+
+#! IMPORTS
+
+
+import argparse
+import copy
+import os
+import sys
+from os.path import dirname
+
+import numpy as np
+
+ROOT = dirname(dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from checkupy import fingerprints, score_batch, synthetic_population
+from checkupy.checkupy import BIAInput, Fitness
+
+#! CONSTANTS
+
+
+BETAS = sorted(i for i in dir(BIAInput) if i.endswith("_betas"))
+TABLES = sorted(Fitness._coefficient_tables.values())
+
+
+#! FUNCTIONS
+
+
+def changed_values(before, after):
+    """return the (method, measure) columns whose values differ"""
+    out = set()
+    for column in before.columns:
+        x, y = before[column].to_numpy(), after[column].to_numpy()
+        if x.dtype.kind in "fiu":
+            same = np.allclose(x, y, rtol=1e-12, atol=0, equal_nan=True)
+        else:
+            same = bool((x == y).all())
+        if not same:
+            out.add(column)
+    return out
+
+
+def changed_prints(before, after):
+    """return the (method, measure) whose fingerprint differs"""
+    return {
+        (method, measure)
+        for method, prints in before.items()
+        for measure, value in prints.items()
+        if after[method][measure] != value
+    }
+
+
+def perturbations():
+    """
+    yield the label, the class, the attribute and the perturbed value of
+    each coefficient to be checked
+    """
+    for name in BETAS:
+        betas = getattr(BIAInput, name)
+        yield name, BIAInput, name, (betas[0] + 1, betas[1] * 1.01)
+    for name in TABLES:
+        table = getattr(Fitness, name)
+        for measure, coefs in table.items():
+            for feature in coefs:
+                # the table is replaced (not mutated), as required to
+                # rebuild the coefficients matrix
+                new = copy.deepcopy(table)
+                new[measure][feature] *= 1.01
+                yield f"{measure}.{feature}", Fitness, name, new
+
+
+def check(data, corrected: bool):
+    """
+    apply each perturbation and return the missed and the over-invalidated
+    measures of each of them
+    """
+    base = score_batch(data, corrected_electrical_values=corrected)
+    prints = fingerprints(corrected_electrical_values=corrected)
+    report = {}
+    for label, cls, name, value in perturbations():
+        original = getattr(cls, name)
+        setattr(cls, name, value)
+        try:
+            values = changed_values(
+                base, score_batch(data, corrected_electrical_values=corrected)
+            )
+            stale = changed_prints(
+                prints, fingerprints(corrected_electrical_values=corrected)
+            )
+        finally:
+            setattr(cls, name, original)
+        report[label] = (values - stale, stale - values)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = synthetic_population(args.rows, seed=args.seed)
+    failed = False
+    for corrected in [False, True]:
+        print(f"corrected_electrical_values={corrected}")
+        for name, (missed, extra) in check(data, corrected).items():
+            status = "FAIL" if len(missed) > 0 else "ok"
+            counts = f"missed {len(missed):3d}  extra {len(extra):3d}"
+            print(f"  {name:54s} {counts}  {status}")
+            for method, measure in sorted(missed):
+                print(f"      missed: {method}.{measure}")
+            failed |= len(missed) > 0
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
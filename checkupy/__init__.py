@@ -2,3 +2,18 @@
 
 from .checkupy import *
 from .onnx_models import *
+from .registry import *
+from .adapters import *
+from .batch import *
+from .accessor import *
+from .uncertainty import *
+from .sensitivity import *
+from .stats import *
+from .agreement import *
+from .cohorts import *
+from .prefork import *
+from .daemon import *
+from .tuning import *
+from .metrics import *
+from .synthetic import *
+from .versioning import *
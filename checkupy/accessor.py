@@ -0,0 +1,131 @@
+"""module providing the "bia" pandas DataFrame accessor"""
+
+#! IMPORTS
+
+
+from typing import Literal
+
+import pandas as pd
+
+from .batch import score_batch, validate_batch
+
+__all__ = ["BIAAccessor"]
+
+
+#! CLASSES
+
+
+@pd.api.extensions.register_dataframe_accessor("bia")
+class BIAAccessor:
+    """
+    pandas accessor scoring whole DataFrames of measurements column-wise.
+    The DataFrame columns must be named as the CheckupBIA input arguments.
+
+    Examples
+    --------
+    >>> import checkupy
+    >>> df.bia.fitness()
+    >>> df.bia.checkup(fields=["total_body_fatmassperc"])
+    >>> valid, errors = df.bia.validate()
+    """
+
+    def __init__(self, obj: pd.DataFrame):
+        self._obj = obj
+
+    def _score(self, method: str, **kwargs):
+        """return the measures of a single methodology"""
+        scores = score_batch(data=self._obj, methods=method, **kwargs)
+        out = scores[method]
+        out.attrs.update(scores.attrs)
+        return out
+
+    def fitness(
+        self,
+        fields: str | list[str] | None = None,
+        corrected_electrical_values: bool = False,
+        deduplicate: bool = False,
+        validate: bool = False,
+        precision: Literal["float64", "float32"] = "float64",
+    ):
+        """return the fitness-equations based measures of each row"""
+        return self._score(
+            "fitness",
+            fields=fields,
+            corrected_electrical_values=corrected_electrical_values,
+            deduplicate=deduplicate,
+            validate=validate,
+            precision=precision,
+        )
+
+    def standard(
+        self,
+        fields: str | list[str] | None = None,
+        corrected_electrical_values: bool = False,
+        deduplicate: bool = False,
+        validate: bool = False,
+        precision: Literal["float64", "float32"] = "float64",
+    ):
+        """return the standard-equations based measures of each row"""
+        return self._score(
+            "standard",
+            fields=fields,
+            corrected_electrical_values=corrected_electrical_values,
+            deduplicate=deduplicate,
+            validate=validate,
+            precision=precision,
+        )
+
+    def inbody(
+        self,
+        fields: str | list[str] | None = None,
+        corrected_electrical_values: bool = False,
+        inbody_model: str | None = None,
+        deduplicate: bool = False,
+        validate: bool = False,
+        precision: Literal["float64", "float32"] = "float64",
+    ):
+        """return the inbody-model based measures of each row"""
+        return self._score(
+            "inbody",
+            fields=fields,
+            corrected_electrical_values=corrected_electrical_values,
+            inbody_model=inbody_model,
+            deduplicate=deduplicate,
+            validate=validate,
+            precision=precision,
+        )
+
+    def checkup(
+        self,
+        fields: str | list[str] | None = None,
+        methods: str | list[str] | tuple[str, ...] = ("fitness", "standard", "inbody"),
+        corrected_electrical_values: bool = False,
+        inbody_model: str | None = None,
+        deduplicate: bool = False,
+        validate: bool = False,
+        precision: Literal["float64", "float32"] = "float64",
+    ):
+        """
+        return the measures of each row with (methodology, measure) columns
+        """
+        return score_batch(
+            data=self._obj,
+            methods=methods,
+            fields=fields,
+            corrected_electrical_values=corrected_electrical_values,
+            inbody_model=inbody_model,
+            deduplicate=deduplicate,
+            validate=validate,
+            precision=precision,
+        )
+
+    def validate(
+        self,
+        methods: str | list[str] | tuple[str, ...] = ("fitness", "standard", "inbody"),
+        ranges: dict[str, tuple[float, float]] | None = None,
+    ):
+        """
+        return the boolean Series of the valid rows and the table of the
+        input errors (see validate_batch)
+        """
+        return validate_batch(data=self._obj, methods=methods, ranges=ranges)
@@ -0,0 +1,83 @@
+"""
+module providing zero-copy input adapters for Arrow and Polars data
+
+pyarrow and polars are optional dependencies: they are never imported by
+this module, which recognizes their objects by type name only.
+"""
+
+#! IMPORTS
+
+
+import numpy as np
+
+__all__ = ["is_columnar", "as_columns"]
+
+
+#! FUNCTIONS
+
+
+def _kind(data):
+    """return "arrow", "polars" or None according to the type of data"""
+    module = type(data).__module__.split(".")[0]
+    name = type(data).__name__
+    if module == "pyarrow" and name in ("Table", "RecordBatch"):
+        return "arrow"
+    if module == "polars" and name == "DataFrame":
+        return "polars"
+    return None
+
+
+def is_columnar(data):
+    """
+    return True if data is an Arrow Table, an Arrow RecordBatch or a Polars
+    DataFrame
+    """
+    return _kind(data) is not None
+
+
+def _arrow_to_numpy(column):
+    """
+    return an Arrow Array or ChunkedArray as numpy array, without copying
+    the data buffer whenever possible (single chunk of a primitive type
+    without nulls)
+    """
+    if type(column).__name__ == "ChunkedArray":
+        if column.num_chunks == 1:
+            column = column.chunk(0)
+        else:
+            return column.to_numpy()
+    try:
+        return column.to_numpy(zero_copy_only=True)
+    except Exception:
+        return column.to_numpy(zero_copy_only=False)
+
+
+def as_columns(data, fields: list[str] | tuple[str, ...]):
+    """
+    project an Arrow Table, an Arrow RecordBatch or a Polars DataFrame onto
+    the given fields.
+
+    Parameters
+    ----------
+    data: pyarrow.Table | pyarrow.RecordBatch | polars.DataFrame
+        the input data
+
+    fields: list[str] | tuple[str, ...]
+        the columns to be extracted. Any other column is never read.
+
+    Returns
+    -------
+    columns: dict[str, np.ndarray]
+        the requested columns as 1D numpy arrays. Numeric columns without
+        nulls are zero-copy views of the source buffers.
+    """
+    kind = _kind(data)
+    if kind is None:
+        raise TypeError("data must be an Arrow Table/RecordBatch or a Polars DataFrame")
+    names = data.column_names if kind == "arrow" else data.columns
+    missing = [i for i in fields if i not in names]
+    if len(missing) > 0:
+        raise ValueError(f"Missing input fields: {missing}")
+    if kind == "arrow":
+        return {i: _arrow_to_numpy(data.column(i)) for i in fields}
+    return {i: np.asarray(data.get_column(i).to_numpy()) for i in fields}
@@ -0,0 +1,216 @@
+"""
+module dedicated to the streaming comparison of the methodologies
+(bias, Bland-Altman limits of agreement, RMSE and correlation)
+"""
+
+#! IMPORTS
+
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from .batch import score_batch
+from .checkupy import CheckupBIA
+from .stats import CoMoments
+
+__all__ = ["MethodAgreement", "compare_methods"]
+
+
+#! CLASSES
+
+
+class MethodAgreement:
+    """
+    streaming agreement statistics between two methodologies.
+
+    The measures are accumulated chunk by chunk in constant memory with
+    single-pass, numerically stable and mergeable accumulators, so that
+    partial results computed on different chunks, threads or processes can
+    be combined with merge().
+
+    Parameters
+    ----------
+    method_a: str = "fitness"
+        the first methodology
+
+    method_b: str = "inbody"
+        the second methodology
+
+    fields: str | list[str] | None = None
+        the measures to be compared. If None, all the numeric measures
+        provided by both methodologies are compared.
+
+    corrected_electrical_values: bool = False
+        are the electrical data corrected for orthostatism?
+
+    inbody_model: str | None = None
+        the key of the Inbody model in the default registry
+    """
+
+    _measures: list[str] | None
+    _moments: CoMoments | None
+
+    def __init__(
+        self,
+        method_a: str = "fitness",
+        method_b: str = "inbody",
+        fields: str | list[str] | None = None,
+        corrected_electrical_values: bool = False,
+        inbody_model: str | None = None,
+    ):
+        for method in (method_a, method_b):
+            if method not in CheckupBIA._available_methods:
+                raise ValueError(f"Unknown method: {method}")
+        if method_a == method_b:
+            raise ValueError("method_a and method_b must be different")
+        self._method_a = method_a
+        self._method_b = method_b
+        self._fields = [fields] if isinstance(fields, str) else fields
+        self._corrected = corrected_electrical_values
+        self._inbody_model = inbody_model
+        self._measures = None
+        self._moments = None
+
+    @property
+    def methods(self):
+        """the compared methodologies"""
+        return self._method_a, self._method_b
+
+    @property
+    def measures(self):
+        """the compared measures (None until the first update)"""
+        return self._measures
+
+    def update(self, chunk):
+        """
+        score a chunk of measurements with both methodologies and add the
+        results to the statistics
+
+        Parameters
+        ----------
+        chunk: pd.DataFrame | dict | pyarrow.Table | pyarrow.RecordBatch | polars.DataFrame
+            the measurements, as accepted by score_batch
+        """
+        scores = score_batch(
+            data=chunk,
+            methods=self.methods,
+            fields=self._fields,
+            corrected_electrical_values=self._corrected,
+            inbody_model=self._inbody_model,
+        )
+        return self.update_scores(scores[self._method_a], scores[self._method_b])
+
+    def update_scores(self, scores_a: pd.DataFrame, scores_b: pd.DataFrame):
+        """
+        add already computed measures to the statistics
+
+        Parameters
+        ----------
+        scores_a, scores_b: pd.DataFrame
+            the measures of the same rows according to method_a and method_b
+        """
+        if self._measures is None:
+            numeric_a = scores_a.select_dtypes("number").columns
+            numeric_b = set(scores_b.select_dtypes("number").columns)
+            self._measures = [i for i in numeric_a if i in numeric_b]
+            self._moments = CoMoments(len(self._measures))
+        self._moments.update(  # type: ignore
+            scores_a[self._measures].to_numpy(dtype=float),
+            scores_b[self._measures].to_numpy(dtype=float),
+        )
+        return self
+
+    def merge(self, other: "MethodAgreement"):
+        """merge the statistics accumulated by another MethodAgreement"""
+        if other.methods != self.methods:
+            raise ValueError("Cannot merge the agreement of different methods")
+        if other._moments is None:
+            return self
+        if self._moments is None:
+            self._measures = list(other._measures)  # type: ignore
+            self._moments = CoMoments(len(self._measures))
+        elif other._measures != self._measures:
+            raise ValueError("Cannot merge the agreement of different measures")
+        self._moments.merge(other._moments)
+        return self
+
+    def summary(self):
+        """
+        return the agreement statistics of each measure:
+
+            n: the number of pairs
+            mean_a, mean_b: the mean of each methodology
+            bias: the mean difference (method_a - method_b)
+            sd: the standard deviation of the differences
+            loa_lower, loa_upper: the 95% limits of agreement (bias -/+ 1.96 sd)
+            rmse: the root mean squared difference
+            r: the Pearson correlation between the methodologies
+        """
+        columns = [
+            "n",
+            "mean_a",
+            "mean_b",
+            "bias",
+            "sd",
+            "loa_lower",
+            "loa_upper",
+            "rmse",
+            "r",
+        ]
+        if self._moments is None:
+            return pd.DataFrame(columns=columns)
+        mom = self._moments
+        bias = mom.mean_x - mom.mean_y
+        sd = mom.var_diff**0.5
+        with np.errstate(invalid="ignore", divide="ignore"):
+            msd = np.maximum(mom.m2_x + mom.m2_y - 2 * mom.c_xy, 0) / mom.count
+        out = pd.DataFrame(
+            {
+                "n": mom.count.astype(int),
+                "mean_a": mom.mean_x,
+                "mean_b": mom.mean_y,
+                "bias": bias,
+                "sd": sd,
+                "loa_lower": bias - 1.96 * sd,
+                "loa_upper": bias + 1.96 * sd,
+                "rmse": (bias**2 + msd) ** 0.5,
+                "r": mom.corr,
+            },
+            index=pd.Index(self._measures, name="measure"),
+        )
+        return out[columns]
+
+
+#! FUNCTIONS
+
+
+def compare_methods(
+    chunks: Iterable,
+    method_a: str = "fitness",
+    method_b: str = "inbody",
+    fields: str | list[str] | None = None,
+    corrected_electrical_values: bool = False,
+    inbody_model: str | None = None,
+):
+    """
+    compute the agreement statistics between two methodologies over an
+    iterable of chunks of measurements (e.g. pd.read_csv(..., chunksize=...)
+    or the record batches of an Arrow dataset) in constant memory.
+
+    Returns
+    -------
+    summary: pd.DataFrame
+        the agreement statistics of each measure (see MethodAgreement.summary)
+    """
+    agreement = MethodAgreement(
+        method_a=method_a,
+        method_b=method_b,
+        fields=fields,
+        corrected_electrical_values=corrected_electrical_values,
+        inbody_model=inbody_model,
+    )
+    for chunk in chunks:
+        agreement.update(chunk)
+    return agreement.summary()
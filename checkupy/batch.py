@@ -0,0 +1,524 @@
+"""module dedicated to the vectorized processing of batches of measurements"""
+
+#! IMPORTS
+
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from threading import Lock
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+
+from .adapters import as_columns, is_columnar
+from .checkupy import CheckupBIA, Fitness, Inbody, Standard
+from .metrics import VALIDATION_ERRORS
+from .tuning import load_tuning
+
+__all__ = [
+    "INPUT_FIELDS",
+    "INPUT_RANGES",
+    "GENDERS",
+    "FLOAT32_TOLERANCE",
+    "validate_batch",
+    "score_batch",
+]
+
+
+#! CONSTANTS
+
+
+# the measurement inputs, named as the CheckupBIA arguments
+INPUT_FIELDS = (
+    "height",
+    "weight",
+    "age",
+    "gender",
+    "left_arm_resistance",
+    "left_arm_reactance",
+    "left_trunk_resistance",
+    "left_trunk_reactance",
+    "left_leg_resistance",
+    "left_leg_reactance",
+    "left_body_resistance",
+    "left_body_reactance",
+    "right_arm_resistance",
+    "right_arm_reactance",
+    "right_trunk_resistance",
+    "right_trunk_reactance",
+    "right_leg_resistance",
+    "right_leg_reactance",
+    "right_body_resistance",
+    "right_body_reactance",
+)
+
+# the supported computation precisions
+_PRECISIONS = ("float64", "float32")
+
+# the minimum number of rows scored by each worker process, below which the
+# batch is scored in the calling process
+_PROCESS_MIN_ROWS = 4096
+
+# the pool of worker processes as (processes, pool), created on first use
+_POOL: tuple[int, ProcessPoolExecutor] | None = None
+_POOL_LOCK = Lock()
+
+# accuracy bounds of the float32 precision: every measure x32 computed in single
+# precision satisfies |x32 - x64| <= atol + rtol * |x64| with respect to the
+# double precision value x64, where rtol and atol are FLOAT32_TOLERANCE[measure]
+# (in the units of the measure, see benchmarks/float32_accuracy.py). The fat
+# masses (and their percentages and indexes) are small differences of large
+# quantities, hence they need a larger absolute margin.
+FLOAT32_TOLERANCE = {
+    i: {"rtol": 4e-6, "atol": 1e-4 if "_fatmass" in i else 1e-6}
+    for i in sorted(set(Fitness.measures() + Standard.measures() + Inbody.measures()))
+}
+
+# the accepted gender values
+GENDERS = ("M", "F", "O")
+
+# the physiologically plausible (min, max) range of each numeric input
+INPUT_RANGES = {
+    "height": (90.0, 230.0),
+    "weight": (20.0, 300.0),
+    "age": (6.0, 100.0),
+    **{
+        f"{side}_{segment}_resistance": bounds
+        for side in ("left", "right")
+        for segment, bounds in [
+            ("arm", (100.0, 800.0)),
+            ("trunk", (2.0, 80.0)),
+            ("leg", (80.0, 700.0)),
+            ("body", (200.0, 1500.0)),
+        ]
+    },
+    **{
+        f"{side}_{segment}_reactance": bounds
+        for side in ("left", "right")
+        for segment, bounds in [
+            ("arm", (2.0, 120.0)),
+            ("trunk", (0.5, 40.0)),
+            ("leg", (2.0, 120.0)),
+            ("body", (5.0, 200.0)),
+        ]
+    },
+}
+
+
+#! FUNCTIONS
+
+
+def _required_fields(methods: tuple[str, ...]):
+    """return the input fields required by the given methodologies"""
+    if any(i != "inbody" for i in methods):
+        return INPUT_FIELDS
+    return tuple(i for i in INPUT_FIELDS if "_trunk_" not in i)
+
+
+def _to_columns(data, fields: tuple[str, ...]):
+    """
+    extract the required fields from data as a dict of 1D numpy arrays
+
+    Returns
+    -------
+    columns: dict[str, np.ndarray]
+        the input columns
+
+    index: pd.Index
+        the index of the input rows
+    """
+    if is_columnar(data):
+        columns = as_columns(data, fields)
+    elif isinstance(data, (pd.DataFrame, dict)):
+        keys = data.columns if isinstance(data, pd.DataFrame) else data.keys()
+        missing = [i for i in fields if i not in keys]
+        if len(missing) > 0:
+            raise ValueError(f"Missing input fields: {missing}")
+        columns = {i: np.asarray(data[i]).reshape(-1) for i in fields}
+    else:
+        raise TypeError(
+            "data must be a pandas DataFrame, a dict of arrays, an Arrow "
+            + "Table/RecordBatch or a Polars DataFrame"
+        )
+    lengths = {len(v) for v in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("All the input fields must have the same length")
+    if isinstance(data, pd.DataFrame):
+        index = data.index
+    else:
+        index = pd.RangeIndex(lengths.pop() if len(lengths) > 0 else 0)
+    return columns, index
+
+
+def _as_column(value, nrows: int, dtype: np.dtype):
+    """
+    broadcast a measure to nrows values, casting float64 values to dtype
+    (i.e. the constant NaN of the unavailable measures in float32 batches)
+    """
+    value = np.broadcast_to(value, nrows)
+    if value.dtype == np.float64 and dtype != np.float64:
+        return value.astype(dtype)
+    return value
+
+
+def _unique_rows(columns: dict[str, np.ndarray]):
+    """
+    find the distinct rows by hashing their fields. The rows sharing a hash
+    are compared with the first one of their group, so that a hash collision
+    never merges different rows.
+
+    Returns
+    -------
+    first: np.ndarray
+        the position of the first occurrence of each distinct row
+
+    inverse: np.ndarray
+        the position in first of the distinct row matching each input row
+    """
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(columns), index=False)
+    inverse, _ = pd.factorize(hashes.to_numpy())
+    _, first = np.unique(inverse, return_index=True)
+
+    # rows differing from the first one of their group are kept as distinct
+    equal = np.ones(len(inverse), dtype=bool)
+    for values in columns.values():
+        reference = values[first][inverse]
+        equal &= (values == reference) | (pd.isna(values) & pd.isna(reference))
+    collided = np.flatnonzero(~equal)
+    if len(collided) > 0:
+        inverse = inverse.copy()
+        inverse[collided] = len(first) + np.arange(len(collided))
+        first = np.concatenate([first, collided])
+    return first, inverse
+
+
+def _check_columns(
+    columns: dict[str, np.ndarray],
+    ranges: dict[str, tuple[float, float]],
+):
+    """
+    check the input columns
+
+    Returns
+    -------
+    checked: dict[str, np.ndarray]
+        the columns with numeric fields coerced to float (NaN if not valid)
+
+    errors: list[tuple[np.ndarray, str, np.ndarray, str]]
+        the (row positions, field, values, error) of each kind of error
+    """
+    checked = {}
+    errors = []
+    for field, values in columns.items():
+        values = np.asarray(values)
+        if values.dtype.kind in "fiub":
+            missing = np.isnan(values) if values.dtype.kind == "f" else None
+        else:
+            missing = pd.isna(values)
+        if missing is not None and missing.any():
+            errors.append((np.flatnonzero(missing), field, values, "missing"))
+
+        # gender
+        if field == "gender":
+            wrong = ~np.isin(values.astype(object), GENDERS)
+            if missing is not None:
+                wrong &= ~missing
+            if wrong.any():
+                msg = f"not in {list(GENDERS)}"
+                errors.append((np.flatnonzero(wrong), field, values, msg))
+            checked[field] = values
+            continue
+
+        # numeric fields
+        if values.dtype.kind in "fiub":
+            numbers = values.astype(float, copy=False)
+        else:
+            numbers = pd.to_numeric(pd.Series(values), errors="coerce")
+            numbers = numbers.to_numpy(dtype=float, na_value=np.nan)
+            wrong = np.isnan(numbers) & ~missing  # type: ignore
+            if wrong.any():
+                errors.append((np.flatnonzero(wrong), field, values, "not numeric"))
+        if field in ranges:
+            low, high = ranges[field]
+            with np.errstate(invalid="ignore"):
+                wrong = (numbers < low) | (numbers > high)
+            if wrong.any():
+                msg = f"out of range [{low:g}, {high:g}]"
+                errors.append((np.flatnonzero(wrong), field, values, msg))
+        checked[field] = numbers
+    for rows, field, _, _ in errors:
+        VALIDATION_ERRORS.inc(len(rows), field=field)
+    return checked, errors
+
+
+def _error_table(errors: list, index: pd.Index):
+    """return the errors as a DataFrame sorted by row"""
+    columns = ["row", "field", "value", "error"]
+    if len(errors) == 0:
+        return pd.DataFrame(columns=columns)
+    rows = np.concatenate([i[0] for i in errors])
+    out = pd.DataFrame(
+        {
+            "position": rows,
+            "row": index[rows],
+            "field": np.repeat([i[1] for i in errors], [len(i[0]) for i in errors]),
+            "value": np.concatenate([i[2][i[0]].astype(object) for i in errors]),
+            "error": np.repeat([i[3] for i in errors], [len(i[0]) for i in errors]),
+        }
+    )
+    out = out.sort_values("position", kind="stable")
+    return out[columns].reset_index(drop=True)
+
+
+def _process_pool(processes: int):
+    """
+    return the pool of worker processes, created again when the number of
+    processes changes. The onnxruntime thread pools do not survive fork(),
+    hence the workers are started from a clean process (forkserver) or
+    spawned.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None or _POOL[0] != processes:
+            if _POOL is not None:
+                _POOL[1].shutdown(wait=False)
+            context = get_context("forkserver" if os.name == "posix" else "spawn")
+            _POOL = (processes, ProcessPoolExecutor(processes, mp_context=context))
+        return _POOL[1]
+
+
+def _score_columns(
+    columns: dict[str, np.ndarray],
+    nrows: int,
+    dtype: np.dtype,
+    fields: str | list[str] | None,
+    kwargs: dict,
+):
+    """
+    compute the measures of the nrows rows of the input columns (kwargs are
+    the CheckupBIA options), returning them with a RangeIndex and
+    (methodology, measure) columns
+    """
+    params = {i: columns.get(i, np.nan) for i in INPUT_FIELDS}
+    checkup = CheckupBIA(**params, **kwargs)
+    frames = {
+        method: pd.DataFrame(
+            {i: _as_column(v, nrows, dtype) for i, v in values.items()}
+        )
+        for method, values in checkup.to_dict(fields).items()
+    }
+    return pd.concat(frames, axis=1)
+
+
+def _score_processes(
+    columns: dict[str, np.ndarray],
+    nrows: int,
+    dtype: np.dtype,
+    fields: str | list[str] | None,
+    processes: int,
+    kwargs: dict,
+):
+    """
+    compute the measures of the input columns split in contiguous parts
+    over processes worker processes
+    """
+    parts = np.array_split(np.arange(nrows), processes)
+    pool = _process_pool(processes)
+    results = pool.map(
+        _score_columns,
+        [{i: v[rows] for i, v in columns.items()} for rows in parts],
+        [len(rows) for rows in parts],
+        [dtype] * processes,
+        [fields] * processes,
+        [kwargs] * processes,
+    )
+    return pd.concat(list(results), axis=0, ignore_index=True)
+
+
+def validate_batch(
+    data: pd.DataFrame | dict,
+    methods: str | list[str] | tuple[str, ...] = CheckupBIA._available_methods,
+    ranges: dict[str, tuple[float, float]] | None = None,
+):
+    """
+    check the types, the gender values and the physiological ranges of the
+    input fields of a batch of measurements at once
+
+    Parameters
+    ----------
+    data: pd.DataFrame | dict | pyarrow.Table | pyarrow.RecordBatch | polars.DataFrame
+        the measurements, as accepted by score_batch. A missing input field
+        raises a ValueError as it invalidates the whole batch.
+
+    methods: str | list[str] | tuple[str, ...] = ("fitness", "standard", "inbody")
+        the methodologies whose input fields are checked
+
+    ranges: dict[str, tuple[float, float]] | None = None
+        the (min, max) accepted range of the numeric fields, updating
+        INPUT_RANGES.
+
+    Returns
+    -------
+    valid: pd.Series
+        a boolean Series with the same index of data flagging the rows
+        without errors
+
+    errors: pd.DataFrame
+        one line for each invalid value with columns "row" (the index of the
+        row in data), "field", "value" and "error"
+    """
+    if isinstance(methods, str):
+        methods = [methods]
+    columns, index = _to_columns(data, _required_fields(tuple(methods)))
+    _, errors = _check_columns(columns, {**INPUT_RANGES, **(ranges or {})})
+    valid = np.ones(len(index), dtype=bool)
+    for rows, *_ in errors:
+        valid[rows] = False
+    return pd.Series(valid, index=index), _error_table(errors, index)
+
+
+def score_batch(
+    data: pd.DataFrame | dict,
+    methods: str | list[str] | tuple[str, ...] = CheckupBIA._available_methods,
+    fields: str | list[str] | None = None,
+    corrected_electrical_values: bool = False,
+    inbody_model: str | None = None,
+    deduplicate: bool = False,
+    validate: bool = False,
+    precision: Literal["float64", "float32"] = "float64",
+    processes: int | None = None,
+):
+    """
+    compute the body composition measures of a batch of measurements at
+    once. The equations are evaluated column-wise over the whole batch and
+    the Inbody model is called once (by each worker process, if any).
+
+    Parameters
+    ----------
+    data: pd.DataFrame | dict | pyarrow.Table | pyarrow.RecordBatch | polars.DataFrame
+        the measurements. It must contain (as columns or keys) the
+        CheckupBIA input arguments listed in INPUT_FIELDS. Trunk data are not
+        required if only the "inbody" methodology is selected. Arrow and
+        Polars inputs are projected on these fields and their numeric
+        columns are used as zero-copy numpy views whenever possible.
+
+    methods: str | list[str] | tuple[str, ...] = ("fitness", "standard", "inbody")
+        the methodologies to be used
+
+    fields: str | list[str] | None = None
+        the measures to be returned. If None, all the available measures
+        are returned.
+
+    corrected_electrical_values: bool = False
+        are the electrical data corrected for orthostatism?
+
+    inbody_model: str | None = None
+        the "name" or "name:version" key of the model used by the Inbody
+        methodology in the default registry. If None, the built-in model
+        is used.
+
+    deduplicate: bool = False
+        if True, identical input rows are detected by hashing their fields
+        and computed only once, then the results are scattered back to all
+        the original rows. The number of distinct rows and the fraction of
+        duplicated rows are reported in scores.attrs["deduplication"].
+
+    validate: bool = False
+        if True, the inputs are checked as in validate_batch and only the
+        valid rows are computed, the invalid ones being returned with
+        missing measures. The error table is reported as a dict of lists
+        in scores.attrs["errors"] (use pd.DataFrame(scores.attrs["errors"])
+        to get the table returned by validate_batch).
+
+    precision: Literal["float64", "float32"] = "float64"
+        the floating point precision of the computations. With "float32"
+        the numeric inputs are cast once and the equations and the output
+        columns are kept in single precision, halving the memory of the
+        intermediate arrays. See FLOAT32_TOLERANCE for the accuracy bounds of
+        each measure.
+
+    processes: int | None = None
+        the number of worker processes. If None, the tuned value (see tune)
+        or 1 is used. The validation and the deduplication run in the
+        calling process, then large batches are split in contiguous parts
+        of at least 4096 rows computed in parallel by a pool of processes
+        kept for the next calls. As with any process pool, the calling
+        script must be protected by the if __name__ == "__main__" guard.
+        The checkup metrics of the worker processes are not reported by
+        the calling process.
+
+    Returns
+    -------
+    scores: pd.DataFrame
+        the measures of each row of data, with the same index of data and
+        (methodology, measure) columns.
+    """
+    if isinstance(methods, str):
+        methods = [methods]
+    methods = tuple(methods)
+    columns, index = _to_columns(data, _required_fields(methods))
+
+    # skip the invalid rows
+    if validate:
+        columns, errors = _check_columns(columns, INPUT_RANGES)
+        valid = np.ones(len(index), dtype=bool)
+        for rows, *_ in errors:
+            valid[rows] = False
+        selected = np.flatnonzero(valid)
+        columns = {i: v[selected] for i, v in columns.items()}
+    nvalid = len(index) if not validate else len(selected)
+
+    # compute each distinct row once
+    if deduplicate:
+        first, inverse = _unique_rows(columns)
+        columns = {i: v[first] for i, v in columns.items()}
+        nrows = len(first)
+    else:
+        nrows = nvalid
+
+    # single precision inputs keep the whole computation in float32
+    if precision not in _PRECISIONS:
+        raise ValueError(f"precision must be one of {list(_PRECISIONS)}")
+    dtype = np.dtype(precision)
+    if precision == "float32":
+        columns = {
+            i: v if i == "gender" else np.asarray(v, dtype=dtype)
+            for i, v in columns.items()
+        }
+
+    # large batches are split over the worker processes
+    kwargs = dict(
+        corrected_electrical_values=corrected_electrical_values,
+        methods=methods,
+        inbody_model=inbody_model,
+    )
+    processes = load_tuning()["processes"] if processes is None else processes
+    processes = min(int(processes), nrows // _PROCESS_MIN_ROWS)
+    if processes > 1:
+        scores = _score_processes(columns, nrows, dtype, fields, processes, kwargs)
+    else:
+        scores = _score_columns(columns, nrows, dtype, fields, kwargs)
+
+    # scatter the results back to the original rows
+    if nrows == len(index):
+        scores.index = index
+    else:
+        positions = inverse if deduplicate else np.arange(nrows)
+        if validate:
+            scattered = np.full(len(index), -1)
+            scattered[selected] = positions
+            positions = scattered
+        scores = scores.reindex(positions)
+        scores.index = index
+    if deduplicate:
+        scores.attrs["deduplication"] = dict(
+            rows=nvalid,
+            unique_rows=nrows,
+            ratio=1 - nrows / nvalid if nvalid > 0 else 0.0,
+        )
+    if validate:
+        # attrs must hold plain containers to survive pandas operations
+        scores.attrs["errors"] = _error_table(errors, index).to_dict("list")
+    return scores
@@ -4,15 +4,53 @@
 
 
 from copy import deepcopy
-from math import atan, exp, log, pi, prod
+from math import pi, prod
+from threading import Lock
+from time import perf_counter
 from typing import Literal
-from .onnx_models import OnnxModel
+from .metrics import CHECKUP_SECONDS, CHECKUPS, ERRORS, INVALID, MODEL_CACHE
+from .onnx_models import OnnxModel, tuned_executor
+from .registry import default_registry
 import numpy as np
 from os.path import join, dirname
 import pandas as pd
 import json
 
-__all__ = ["CheckupBIA"]
+__all__ = ["CheckupBIA", "warmup"]
+
+
+#! CONSTANTS
+
+
+# the layout of the segmental electrical data
+_QUANTITIES = dict(resistance=0, reactance=1, impedance=2, phaseangle=3)
+_SIDES = dict(left=0, right=1)
+_SEGMENTS = dict(arm=0, leg=1, trunk=2, body=3)
+
+
+# a typical measurement, used to exercise the code paths during warm-up
+_SAMPLE = dict(
+    height=175,
+    weight=73.4,
+    age=40,
+    gender="M",
+    left_arm_resistance=322.9,
+    left_arm_reactance=23.9,
+    right_arm_resistance=318.2,
+    right_arm_reactance=25.0,
+    left_leg_resistance=246.2,
+    left_leg_reactance=16.8,
+    right_leg_resistance=248.9,
+    right_leg_reactance=17.5,
+    left_body_resistance=586.9,
+    left_body_reactance=51.6,
+    right_body_resistance=585.6,
+    right_body_reactance=52.6,
+    left_trunk_resistance=12.6,
+    left_trunk_reactance=5.2,
+    right_trunk_resistance=12.5,
+    right_trunk_reactance=5.3,
+)
 
 
 #! CLASS
@@ -47,6 +85,9 @@ class BIAInput:
     _right_body_reactance: int | float
     _corrected: bool
 
+    # the attributes caching values derived from the inputs
+    _cached = ("_segment_cache",)
+
     # orthostatic correction coefficients
     _left_arm_resistance_betas = (-5.929064, 0.874883)
     _left_arm_reactance_betas = (3.304037, 0.686138)
@@ -117,29 +158,157 @@ class BIAInput:
         if self.is_corrected():
             self.remove_orthostatic_correction()
 
-    def _phaseangle_deg(
-        self,
-        res: float | int,
-        rea: float | int,
-    ):
-        """return the phase angle in degrees"""
-        return float(atan(rea / res)) * 180 / pi  # type: ignore
-
-    def set_age(self, age: int | float):
+    def __setattr__(self, name: str, value):
+        """set an attribute, discarding the values derived from the inputs"""
+        super().__setattr__(name, value)
+        if name not in self._cached:
+            for i in self._cached:
+                self.__dict__.pop(i, None)
+
+    def _stack(self, values: list):
+        """
+        return the values (scalars or arrays) stacked along a new last axis,
+        with the floating point precision of the input arrays
+        """
+        values = [np.asarray(i) for i in values]
+        shape = np.broadcast_shapes(*(i.shape for i in values))
+        dtypes = [i.dtype for i in values if i.dtype.kind in "fc" and i.ndim > 0]
+        dtype = np.result_type(*dtypes) if len(dtypes) > 0 else np.float64
+        out = np.empty(shape + (len(values),), dtype=dtype)
+        for k, value in enumerate(values):
+            out[..., k] = value
+        return out
+
+    def _segment_values(self):
+        """
+        return the resistance, reactance, impedance and phase angle of each
+        side and segment as a (quantity, ..., side, segment) array, and
+        their left-right averages as a (quantity, ..., segment) array
+
+        The resistance and the reactance are kept as separate real planes
+        (rather than as R + jXc) and the impedance and the phase angle are
+        obtained from analytic functions, so that complex-step derivatives
+        of the inputs propagate through them.
+        """
+        values = self.__dict__.get("_segment_cache")
+        if values is None:
+            # (quantity, side, segment) order, listed explicitly so that the
+            # dependencies of the measures can be read from the code
+            electric = [
+                self.left_arm_resistance,
+                self.left_leg_resistance,
+                self.left_trunk_resistance,
+                self.left_body_resistance,
+                self.right_arm_resistance,
+                self.right_leg_resistance,
+                self.right_trunk_resistance,
+                self.right_body_resistance,
+                self.left_arm_reactance,
+                self.left_leg_reactance,
+                self.left_trunk_reactance,
+                self.left_body_reactance,
+                self.right_arm_reactance,
+                self.right_leg_reactance,
+                self.right_trunk_reactance,
+                self.right_body_reactance,
+            ]
+            electric = self._stack(electric)
+            shape = electric.shape[:-1] + (2, len(_SIDES), len(_SEGMENTS))
+            res, rea = np.moveaxis(electric.reshape(shape), -3, 0)
+            stacked = np.empty((len(_QUANTITIES),) + res.shape, dtype=res.dtype)
+            stacked[0] = res
+            stacked[1] = rea
+            stacked[2] = (res**2 + rea**2) ** 0.5
+            stacked[3] = np.arctan(rea / res) * 180 / pi
+            values = (stacked, stacked.mean(axis=-2))
+            self._segment_cache = values
+        return values
+
+    def _segment(self, quantity: str, side: str, segment: str):
+        """return a quantity of a side and segment"""
+        values = self._segment_values()[0]
+        out = values[_QUANTITIES[quantity], ..., _SIDES[side], _SEGMENTS[segment]]
+        return out.item() if out.ndim == 0 else out
+
+    def _total(self, quantity: str, segment: str):
+        """return the left-right average of a quantity of a segment"""
+        values = self._segment_values()[1]
+        out = values[_QUANTITIES[quantity], ..., _SEGMENTS[segment]]
+        return out.item() if out.ndim == 0 else out
+
+    def impedance_tensor(self):
+        """
+        return the complex impedance (R + jXc, in Ohm) of each side and
+        segment as a (..., side, segment) array: the sides are (left, right)
+        and the segments are (arm, leg, trunk, body). Batches have shape
+        (N, 2, 4), single measurements (2, 4).
+        """
+        values = self._segment_values()[0]
+        return values[0] + 1j * values[1]
+
+    def asymmetry_indices(self):
+        """
+        return the left-right asymmetry index of the resistance, reactance,
+        impedance and phase angle of each segment, i.e. the left-right
+        difference as percentage of the average of the two sides.
+
+        Returns
+        -------
+        indices: dict[str, float | np.ndarray]
+            the indices, named as "<segment>_<quantity>" (e.g. "arm_impedance")
+        """
+        values, totals = self._segment_values()
+        index = (values[..., 0, :] - values[..., 1, :]) / totals * 100
+        out = {}
+        for quantity, q in _QUANTITIES.items():
+            for segment, g in _SEGMENTS.items():
+                value = index[q, ..., g]
+                value = value.item() if value.ndim == 0 else value
+                out[f"{segment}_{quantity}"] = value
+        return out
+
+    def _as_value(self, value):
+        """
+        return scalars unchanged and any other sequence (e.g. lists or
+        pandas Series) as numpy array
+        """
+        if np.ndim(value) == 0:
+            return value
+        return np.asarray(value)
+
+    def _as_float(self, value):
+        """return value as float or as floating point numpy array"""
+        if np.ndim(value) == 0:
+            return float(value)
+        value = np.asarray(value)
+        if value.dtype.kind in "fc":
+            return value
+        return value.astype(float)
+
+    def _as_int(self, value):
+        """return value as int or as numpy array of truncated values"""
+        if np.ndim(value) == 0:
+            return int(value)
+        value = np.asarray(value)
+        if value.dtype.kind == "f":
+            return np.trunc(value)
+        return value
+
+    def set_age(self, age: int | float | np.ndarray):
         """set the user age in years"""
-        self._age = int(age)
+        self._age = self._as_int(age)
 
-    def set_weight(self, wgt: int | float):
+    def set_weight(self, wgt: int | float | np.ndarray):
         """set the user weight in kg"""
-        self._wgt = float(wgt)
+        self._wgt = self._as_float(wgt)
 
-    def set_height(self, hcm: int | float):
+    def set_height(self, hcm: int | float | np.ndarray):
         """set the user height in cm"""
-        self._hcm = int(hcm)
+        self._hcm = self._as_int(hcm)
 
-    def set_gender(self, gender: Literal["M", "F", "O"]):
+    def set_gender(self, gender: Literal["M", "F", "O"] | np.ndarray):
         """set the user sex"""
-        self._gender = gender
+        self._gender = self._as_value(gender)
 
     def set_left_arm_resistance(self, r: int | float):
         """
@@ -153,7 +322,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._left_arm_resistance = r
+        self._left_arm_resistance = self._as_value(r)
 
     def set_left_arm_reactance(self, r: int | float):
         """
@@ -167,7 +336,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._left_arm_reactance = r
+        self._left_arm_reactance = self._as_value(r)
 
     def set_left_leg_resistance(self, r: int | float):
         """
@@ -181,7 +350,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._left_leg_resistance = r
+        self._left_leg_resistance = self._as_value(r)
 
     def set_left_leg_reactance(self, r: int | float):
         """
@@ -195,7 +364,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._left_leg_reactance = r
+        self._left_leg_reactance = self._as_value(r)
 
     def set_left_trunk_resistance(self, r: int | float):
         """
@@ -209,7 +378,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._left_trunk_resistance = r
+        self._left_trunk_resistance = self._as_value(r)
 
     def set_left_trunk_reactance(self, r: int | float):
         """
@@ -223,7 +392,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._left_trunk_reactance = r
+        self._left_trunk_reactance = self._as_value(r)
 
     def set_left_body_resistance(self, r: int | float):
         """
@@ -237,7 +406,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._left_body_resistance = r
+        self._left_body_resistance = self._as_value(r)
 
     def set_left_body_reactance(self, r: int | float):
         """
@@ -251,7 +420,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._left_body_reactance = r
+        self._left_body_reactance = self._as_value(r)
 
     def set_right_arm_resistance(self, r: int | float):
         """
@@ -265,7 +434,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._right_arm_resistance = r
+        self._right_arm_resistance = self._as_value(r)
 
     def set_right_arm_reactance(self, r: int | float):
         """
@@ -279,7 +448,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._right_arm_reactance = r
+        self._right_arm_reactance = self._as_value(r)
 
     def set_right_leg_resistance(self, r: int | float):
         """
@@ -293,7 +462,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._right_leg_resistance = r
+        self._right_leg_resistance = self._as_value(r)
 
     def set_right_leg_reactance(self, r: int | float):
         """
@@ -307,7 +476,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._right_leg_reactance = r
+        self._right_leg_reactance = self._as_value(r)
 
     def set_right_trunk_resistance(self, r: int | float):
         """
@@ -321,7 +490,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._right_trunk_resistance = r
+        self._right_trunk_resistance = self._as_value(r)
 
     def set_right_trunk_reactance(self, r: int | float):
         """
@@ -335,7 +504,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._right_trunk_reactance = r
+        self._right_trunk_reactance = self._as_value(r)
 
     def set_right_body_resistance(self, r: int | float):
         """
@@ -349,7 +518,7 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._right_body_resistance = r
+        self._right_body_resistance = self._as_value(r)
 
     def set_right_body_reactance(self, r: int | float):
         """
@@ -363,32 +532,56 @@ class BIAInput:
         corrected_electrical_value: bool = False
             is the value raw or corrected?
         """
-        self._right_body_reactance = r
-
-    def to_dict(self):
-        """return all the measures as dictionary"""
-        return {
-            i: getattr(self, i)
-            for i in dir(self)
-            if i.split("_")[0]
-            not in [
-                "set",
-                "to",
-                "",
-                "is",
-                "fitness",
-                "standard",
-                "inbody",
-                "copy",
-                "apply",
-                "remove",
-            ]
-        }
+        self._right_body_reactance = self._as_value(r)
+
+    @classmethod
+    def measures(cls):
+        """return the names of the measures available from the object"""
+        if "_measures" not in cls.__dict__:
+            cls._measures = tuple(
+                i
+                for i in dir(cls)
+                if not i.startswith("_") and isinstance(getattr(cls, i), property)
+            )
+        return cls._measures
+
+    def to_dict(self, fields: str | list[str] | None = None):
+        """
+        return the measures as dictionary
+
+        Parameters
+        ----------
+        fields: str | list[str] | None = None
+            the measures to be returned. If None, all the available measures
+            are returned. Otherwise only the requested measures (and those
+            they depend on) are evaluated.
+        """
+        available = self.measures()
+        if fields is None:
+            fields = list(available)
+        elif isinstance(fields, str):
+            fields = [fields]
+        unknown = [i for i in fields if i not in available]
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown fields: {unknown}")
+        return {i: getattr(self, i) for i in fields}
 
     def is_male(self):
         """return True if the user is declared as male"""
         return self.gender == "M"
 
+    @property
+    def _male(self):
+        """
+        the male indicator to be used in the equations, with the same
+        floating point precision of the weight when batches are provided
+        """
+        male = self.is_male()
+        if np.ndim(male) == 0:
+            return male
+        weight = np.asarray(self._wgt)
+        return male.astype(weight.dtype if weight.dtype.kind == "f" else float)
+
     def is_corrected(self):
         """return true if the electrical data are corrected for orthostaticity"""
         return self._corrected
@@ -525,12 +718,18 @@ class BIAInput:
             valid *= pha[side] >= 3
             valid *= pha[side] <= 12
         valid *= abs(pha["left"] - pha["right"]) <= 1
-        return bool(valid)
+        valid = np.asarray(valid, dtype=bool)
+        invalid = valid.size - int(np.count_nonzero(valid))
+        if invalid > 0:
+            INVALID.inc(invalid, method=type(self).__name__.lower())
+        if valid.ndim == 0:
+            return bool(valid)
+        return valid
 
     @property
     def _trunk_appendicular_index(self):
         """return the ratio between the trunk and appendicular resistance"""
-        return float(
+        return self._as_float(
             2
             * (self.left_trunk_resistance + self.right_trunk_resistance)  # type: ignore
             / (self.left_arm_resistance + self.left_leg_resistance + self.right_arm_resistance + self.right_leg_resistance)  # type: ignore
@@ -569,7 +768,7 @@ class BIAInput:
     @property
     def sex(self):
         """the user sex"""
-        return int(1) if self._gender == "M" else int(0)
+        return self.is_male() * 1
 
     @property
     def left_arm_resistance(self):
@@ -584,12 +783,12 @@ class BIAInput:
     @property
     def left_arm_impedance(self):
         """the left arm impedance in Ohm"""
-        return (self.left_arm_resistance**2 + self.left_arm_reactance**2) ** 0.5
+        return self._segment("impedance", "left", "arm")
 
     @property
     def left_arm_phaseangle(self):
         """the left arm phase angle in degrees"""
-        return self._phaseangle_deg(self.left_arm_resistance, self.left_arm_reactance)
+        return self._segment("phaseangle", "left", "arm")
 
     @property
     def left_leg_resistance(self):
@@ -604,12 +803,12 @@ class BIAInput:
     @property
     def left_leg_impedance(self):
         """the left leg impedance in Ohm"""
-        return (self.left_leg_resistance**2 + self.left_leg_reactance**2) ** 0.5
+        return self._segment("impedance", "left", "leg")
 
     @property
     def left_leg_phaseangle(self):
         """the left leg phase angle in degrees"""
-        return self._phaseangle_deg(self.left_leg_resistance, self.left_leg_reactance)
+        return self._segment("phaseangle", "left", "leg")
 
     @property
     def left_trunk_resistance(self):
@@ -624,14 +823,12 @@ class BIAInput:
     @property
     def left_trunk_impedance(self):
         """the left trunk impedance in Ohm"""
-        return (self.left_trunk_resistance**2 + self.left_trunk_reactance**2) ** 0.5
+        return self._segment("impedance", "left", "trunk")
 
     @property
     def left_trunk_phaseangle(self):
         """the left trunk phase angle in degrees"""
-        return self._phaseangle_deg(
-            self.left_trunk_resistance, self.left_trunk_reactance
-        )
+        return self._segment("phaseangle", "left", "trunk")
 
     @property
     def left_body_resistance(self):
@@ -646,12 +843,12 @@ class BIAInput:
     @property
     def left_body_impedance(self):
         """the left body impedance in Ohm"""
-        return (self.left_body_resistance**2 + self.left_body_reactance**2) ** 0.5
+        return self._segment("impedance", "left", "body")
 
     @property
     def left_body_phaseangle(self):
         """the left body phase angle in degrees"""
-        return self._phaseangle_deg(self.left_body_resistance, self.left_body_reactance)
+        return self._segment("phaseangle", "left", "body")
 
     @property
     def right_arm_resistance(self):
@@ -666,12 +863,12 @@ class BIAInput:
     @property
     def right_arm_impedance(self):
         """the right arm impedance in Ohm"""
-        return (self.right_arm_resistance**2 + self.right_arm_reactance**2) ** 0.5
+        return self._segment("impedance", "right", "arm")
 
     @property
     def right_arm_phaseangle(self):
         """the right arm phase angle in degrees"""
-        return self._phaseangle_deg(self.right_arm_resistance, self.right_arm_reactance)
+        return self._segment("phaseangle", "right", "arm")
 
     @property
     def right_leg_resistance(self):
@@ -686,12 +883,12 @@ class BIAInput:
     @property
     def right_leg_impedance(self):
         """the right leg impedance in Ohm"""
-        return (self.right_leg_resistance**2 + self.right_leg_reactance**2) ** 0.5
+        return self._segment("impedance", "right", "leg")
 
     @property
     def right_leg_phaseangle(self):
         """the right leg phase angle in degrees"""
-        return self._phaseangle_deg(self.right_leg_resistance, self.right_leg_reactance)
+        return self._segment("phaseangle", "right", "leg")
 
     @property
     def right_trunk_resistance(self):
@@ -706,14 +903,12 @@ class BIAInput:
     @property
     def right_trunk_impedance(self):
         """the right trunk impedance in Ohm"""
-        return (self.right_trunk_resistance**2 + self.right_trunk_reactance**2) ** 0.5
+        return self._segment("impedance", "right", "trunk")
 
     @property
     def right_trunk_phaseangle(self):
         """the right trunk phase angle in degrees"""
-        return self._phaseangle_deg(
-            self.right_trunk_resistance, self.right_trunk_reactance
-        )
+        return self._segment("phaseangle", "right", "trunk")
 
     @property
     def right_body_resistance(self):
@@ -728,94 +923,92 @@ class BIAInput:
     @property
     def right_body_impedance(self):
         """the right body impedance in Ohm"""
-        return (self.right_body_resistance**2 + self.right_body_reactance**2) ** 0.5
+        return self._segment("impedance", "right", "body")
 
     @property
     def right_body_phaseangle(self):
         """the right body phase angle in degrees"""
-        return self._phaseangle_deg(
-            self.right_body_resistance, self.right_body_reactance
-        )
+        return self._segment("phaseangle", "right", "body")
 
     @property
     def total_arm_resistance(self):
         """return the average arm resistance in ohm"""
-        return (self.left_arm_resistance + self.right_arm_resistance) / 2
+        return self._total("resistance", "arm")
 
     @property
     def total_arm_reactance(self):
         """return the average arm reactance in ohm"""
-        return (self.left_arm_reactance + self.right_arm_reactance) / 2
+        return self._total("reactance", "arm")
 
     @property
     def total_arm_impedance(self):
         """the average arm impedance in Ohm"""
-        return (self.right_arm_impedance + self.left_arm_impedance) / 2
+        return self._total("impedance", "arm")
 
     @property
     def total_arm_phaseangle(self):
         """the average arm phase angle in degrees"""
-        return (self.right_arm_phaseangle + self.left_arm_phaseangle) / 2
+        return self._total("phaseangle", "arm")
 
     @property
     def total_leg_resistance(self):
         """return the average leg resistance in ohm"""
-        return (self.left_leg_resistance + self.right_leg_resistance) / 2
+        return self._total("resistance", "leg")
 
     @property
     def total_leg_reactance(self):
         """return the average leg reactance in ohm"""
-        return (self.left_leg_reactance + self.right_leg_reactance) / 2
+        return self._total("reactance", "leg")
 
     @property
     def total_leg_impedance(self):
         """the average leg impedance in Ohm"""
-        return (self.right_leg_impedance + self.left_leg_impedance) / 2
+        return self._total("impedance", "leg")
 
     @property
     def total_leg_phaseangle(self):
         """the average leg phase angle in degrees"""
-        return (self.right_leg_phaseangle + self.left_leg_phaseangle) / 2
+        return self._total("phaseangle", "leg")
 
     @property
     def total_trunk_resistance(self):
         """return the average trunk resistance in ohm"""
-        return (self.left_trunk_resistance + self.right_trunk_resistance) / 2
+        return self._total("resistance", "trunk")
 
     @property
     def total_trunk_reactance(self):
         """return the average trunk reactance in ohm"""
-        return (self.left_trunk_reactance + self.right_trunk_reactance) / 2
+        return self._total("reactance", "trunk")
 
     @property
     def total_trunk_impedance(self):
         """the average trunk impedance in Ohm"""
-        return (self.right_trunk_impedance + self.left_trunk_impedance) / 2
+        return self._total("impedance", "trunk")
 
     @property
     def total_trunk_phaseangle(self):
         """the average trunk phase angle in degrees"""
-        return (self.right_trunk_phaseangle + self.left_trunk_phaseangle) / 2
+        return self._total("phaseangle", "trunk")
 
     @property
     def total_body_resistance(self):
         """return the average body resistance in ohm"""
-        return (self.left_body_resistance + self.right_body_resistance) / 2
+        return self._total("resistance", "body")
 
     @property
     def total_body_reactance(self):
         """return the average body reactance in ohm"""
-        return (self.left_body_reactance + self.right_body_reactance) / 2
+        return self._total("reactance", "body")
 
     @property
     def total_body_impedance(self):
         """the average body impedance in Ohm"""
-        return (self.right_body_impedance + self.left_body_impedance) / 2
+        return self._total("impedance", "body")
 
     @property
     def total_body_phaseangle(self):
         """the average body phase angle in degrees"""
-        return (self.right_body_phaseangle + self.left_body_phaseangle) / 2
+        return self._total("phaseangle", "body")
 
 
 class Fitness(BIAInput):
@@ -824,6 +1017,86 @@ class Fitness(BIAInput):
     anthropometric and electric data.
     """
 
+    # coefficients of the linear equations: each measure is the sum of the
+    # features returned by _linear_features times their coefficients
+    _linear_coefficients = dict(
+        total_body_water=dict(
+            intercept=-17.75953,
+            weight=0.12309,
+            age=0.00734,
+            body_height2_resistance=0.55780,
+            body_reactance2=0.00208,
+            body_height2_impedance=0.01627,
+            body_phaseangle2=0.16738,
+            body_height2_phaseangle=0.00152,
+        ),
+        total_body_extracellularwater=dict(
+            intercept=-5.27113,
+            weight=0.04381,
+            age=0.00320,
+            body_height2_resistance=0.22309,
+            body_reactance2=0.00081,
+            body_height2_impedance=0.01760,
+            body_phaseangle2=0.00592,
+            body_height2_phaseangle=0.00041,
+        ),
+        total_body_fatfreemass=dict(
+            intercept=-25.08860,
+            weight=0.17591,
+            age=0.01007,
+            body_height2_resistance=0.73751,
+            body_reactance2=0.00294,
+            body_height2_impedance=0.02856,
+            body_phaseangle2=0.24395,
+            body_height2_phaseangle=0.00217,
+        ),
+        total_body_bonemineralcontent=dict(
+            intercept=-1.72291,
+            weight=0.01673,
+            body_height2_resistance=0.02881,
+            body_reactance2=0.00038,
+            body_height2_reactance=0.00212,
+        ),
+        total_body_skeletalmusclemass=dict(
+            intercept=-18.04706,
+            weight=0.10446,
+            age=0.00543,
+            body_height2_resistance=0.42698,
+            body_reactance2=0.00170,
+            body_height2_impedance=0.01179,
+            body_phaseangle2=0.20090,
+            body_height2_phaseangle=0.00139,
+        ),
+        total_body_basalmetabolicrate=dict(
+            intercept=-340.40464,
+            weight=3.99739,
+            age=0.16695,
+            body_height2_resistance=14.96410,
+            body_height2_impedance=0.35634,
+            body_phaseangle2=5.66971,
+            body_height2_phaseangle=0.05072,
+            male=23.24532,
+            body_reactance=6.67914,
+        ),
+        total_trunk_fatfreemass=dict(
+            intercept=-6.19740,
+            weight=0.20178,
+            trunk_height2_resistance=0.00287,
+            trunk_reactance2=0.01800,
+            trunk_height2_phaseangle=0.00003,
+            male=2.21723,
+            trunk_height2_reactance=0.00157,
+            trunk_impedance2=0.00208,
+        ),
+    )
+
+    # the methods evaluating measures from a coefficient table, with the
+    # name of the table: each measure is versioned by its own coefficients
+    _coefficient_tables = dict(_linear="_linear_coefficients")
+
+    # the attributes caching values derived from the inputs
+    _cached = BIAInput._cached + ("_linear_values",)
+
     def __init__(
         self,
         height: int,
@@ -873,20 +1146,85 @@ class Fitness(BIAInput):
         )
         self.remove_orthostatic_correction()
 
+    def _linear_features(self):
+        """return the features of the linear equations"""
+        hgt2 = self.height**2
+        return dict(
+            intercept=1.0,
+            weight=self.weight,
+            age=self.age,
+            male=self._male,
+            body_height2_resistance=hgt2 / self.total_body_resistance,
+            body_height2_reactance=hgt2 / self.total_body_reactance,
+            body_height2_impedance=hgt2 / self.total_body_impedance,
+            body_height2_phaseangle=hgt2 / self.total_body_phaseangle,
+            body_reactance=self.total_body_reactance,
+            body_reactance2=self.total_body_reactance**2,
+            body_phaseangle2=self.total_body_phaseangle**2,
+            trunk_height2_resistance=hgt2 / self.total_trunk_resistance,
+            trunk_height2_reactance=hgt2 / self.total_trunk_reactance,
+            trunk_height2_phaseangle=hgt2 / self.total_trunk_phaseangle,
+            trunk_reactance2=self.total_trunk_reactance**2,
+            trunk_impedance2=self.total_trunk_impedance**2,
+        )
+
+    @classmethod
+    def _linear_matrix(cls):
+        """
+        return the coefficients matrices of the linear equations. The measures
+        are grouped by the features they use (those with nonzero
+        coefficients), so that a missing feature (e.g. a NaN trunk reading)
+        only affects the measures depending on it. Each group is returned as
+        (features, matrix) with a (features, measures) matrix, together with
+        the (group, column) position of each measure. The matrices are built
+        again when _linear_coefficients is replaced.
+        """
+        table = cls.__dict__.get("_linear_table")
+        if table is None or table[0] is not cls._linear_coefficients:
+            groups = {}
+            for measure, coefs in cls._linear_coefficients.items():
+                features = tuple(sorted(i for i, v in coefs.items() if v != 0))
+                groups.setdefault(features, []).append(measure)
+            matrices = []
+            positions = {}
+            for features, measures in groups.items():
+                matrix = np.array(
+                    [
+                        [cls._linear_coefficients[j][i] for j in measures]
+                        for i in features
+                    ]
+                )
+                matrices.append((features, matrix))
+                for column, measure in enumerate(measures):
+                    positions[measure] = (len(matrices) - 1, column)
+            table = (cls._linear_coefficients, matrices, positions)
+            cls._linear_table = table
+        return table[1:]
+
+    def _linear(self, measure: str):
+        """
+        return a measure obtained from the linear equations. The measures
+        sharing the same features are computed at once as a
+        (N, features) @ (features, measures) product, and all of them are
+        kept until any attribute of the object changes.
+        """
+        matrices, positions = self._linear_matrix()
+        values = self.__dict__.get("_linear_values")
+        if values is None:
+            data = self._linear_features()
+            values = []
+            for features, matrix in matrices:
+                x = self._stack([data[i] for i in features])
+                values.append(x @ matrix.astype(x.dtype, copy=False))
+            self._linear_values = values
+        group, column = positions[measure]
+        return self._as_float(values[group][..., column])
+
     @property
     def total_body_water(self):
         """return the total body water in liters and as percentage
         of the total body weight"""
-        return float(
-            -17.75953
-            + 0.12309 * self.weight
-            + 0.00734 * self.age
-            + 0.55780 * (self.height**2) / self.total_body_resistance
-            + 0.00208 * (self.total_body_reactance**2)
-            + 0.01627 * (self.height**2) / self.total_body_impedance
-            + 0.16738 * (self.total_body_phaseangle**2)
-            + 0.00152 * (self.height**2) / self.total_body_phaseangle
-        )
+        return self._linear("total_body_water")
 
     @property
     def total_body_waterperc(self):
@@ -896,16 +1234,7 @@ class Fitness(BIAInput):
     @property
     def total_body_extracellularwater(self):
         """return the extracellular water in liters"""
-        return float(
-            -5.27113
-            + 0.04381 * self.weight
-            + 0.00320 * self.age
-            + 0.22309 * (self.height**2) / self.total_body_resistance
-            + 0.00081 * (self.total_body_reactance**2)
-            + 0.01760 * (self.height**2) / self.total_body_impedance
-            + 0.00592 * (self.total_body_phaseangle**2)
-            + 0.00041 * (self.height**2) / self.total_body_phaseangle
-        )
+        return self._linear("total_body_extracellularwater")
 
     @property
     def total_body_extracellularwaterperc(self):
@@ -931,16 +1260,7 @@ class Fitness(BIAInput):
     @property
     def total_body_fatfreemass(self):
         """return the free-fat mass in kg"""
-        return float(
-            -25.08860
-            + 0.17591 * self.weight
-            + 0.01007 * self.age
-            + 0.73751 * (self.height**2) / self.total_body_resistance
-            + 0.00294 * (self.total_body_reactance**2)
-            + 0.02856 * (self.height**2) / self.total_body_impedance
-            + 0.24395 * (self.total_body_phaseangle**2)
-            + 0.00217 * (self.height**2) / self.total_body_phaseangle
-        )
+        return self._linear("total_body_fatfreemass")
 
     @property
     def total_body_fatfreemassindex(self):
@@ -976,13 +1296,7 @@ class Fitness(BIAInput):
     @property
     def total_body_bonemineralcontent(self):
         """return the bone mineral content in kg"""
-        return float(
-            -1.72291
-            + 0.01673 * self.weight
-            + 0.02881 * (self.height**2) / self.total_body_resistance
-            + 0.00038 * (self.total_body_reactance**2)
-            + 0.00212 * (self.height**2) / self.total_body_reactance
-        )
+        return self._linear("total_body_bonemineralcontent")
 
     @property
     def total_body_bonemineralcontentperc(self):
@@ -1008,16 +1322,7 @@ class Fitness(BIAInput):
     @property
     def total_body_skeletalmusclemass(self):
         """return the skeletal muscle mass in kg"""
-        return float(
-            -18.04706
-            + 0.10446 * self.weight
-            + 0.00543 * self.age
-            + 0.42698 * (self.height**2) / self.total_body_resistance
-            + 0.00170 * (self.total_body_reactance**2)
-            + 0.01179 * (self.height**2) / self.total_body_impedance
-            + 0.20090 * (self.total_body_phaseangle**2)
-            + 0.00139 * (self.height**2) / self.total_body_phaseangle
-        )
+        return self._linear("total_body_skeletalmusclemass")
 
     @property
     def total_body_skeletalmusclemassindex(self):
@@ -1048,26 +1353,16 @@ class Fitness(BIAInput):
     @property
     def total_body_basalmetabolicrate(self):
         """return the basal metabolic rate in kcal"""
-        return float(
-            -340.40464
-            + 3.99739 * self.weight
-            + 0.16695 * self.age
-            + 14.96410 * (self.height**2) / self.total_body_resistance
-            + 0.35634 * (self.height**2) / self.total_body_impedance
-            + 5.66971 * (self.total_body_phaseangle**2)
-            + 0.05072 * (self.height**2) / self.total_body_phaseangle
-            + 23.24532 * self.is_male()
-            + 6.67914 * self.total_body_reactance
-        )
+        return self._linear("total_body_basalmetabolicrate")
 
     @property
     def left_arm_fatfreemass(self):
         """return the left arm fat free mass in kg"""
-        return float(
+        return self._as_float(
             +0.676
             + 0.026 * self.height**2 / self.left_arm_resistance
             - 11.398 * self._trunk_appendicular_index
-            + 0.346 * self.is_male()
+            + 0.346 * self._male
         )
 
     @property
@@ -1080,11 +1375,11 @@ class Fitness(BIAInput):
     @property
     def left_arm_fatmass(self):
         """return the left arm fat mass in kg"""
-        return float(
+        return self._as_float(
             -0.420
             + 0.107 * self.bmi
             - 0.216 * self.left_arm_phaseangle
-            - 0.163 * self.is_male()
+            - 0.163 * self._male
         )
 
     @property
@@ -1097,11 +1392,11 @@ class Fitness(BIAInput):
     @property
     def right_arm_fatfreemass(self):
         """return the right arm fat free mass in kg"""
-        return float(
+        return self._as_float(
             +0.676
             + 0.026 * self.height**2 / self.right_arm_resistance
             - 11.398 * self._trunk_appendicular_index
-            + 0.346 * self.is_male()
+            + 0.346 * self._male
         )
 
     @property
@@ -1114,11 +1409,11 @@ class Fitness(BIAInput):
     @property
     def right_arm_fatmass(self):
         """return the right arm fat mass in kg"""
-        return float(
+        return self._as_float(
             -0.447
             + 0.102 * self.bmi
             - 0.188 * self.right_arm_phaseangle
-            - 0.155 * self.is_male()
+            - 0.155 * self._male
         )
 
     @property
@@ -1131,11 +1426,11 @@ class Fitness(BIAInput):
     @property
     def left_leg_fatfreemass(self):
         """return the left leg fat free mass in kg"""
-        return float(
+        return self._as_float(
             +4.756
             + 0.067 * self.height**2 / self.left_leg_resistance
             - 54.597 * self._trunk_appendicular_index
-            + 0.901 * self.is_male()
+            + 0.901 * self._male
         )
 
     @property
@@ -1149,10 +1444,10 @@ class Fitness(BIAInput):
     def left_leg_fatmass(self):
         """return the left leg fat mass in kg and as percentage of
         the as percentage of the total fat mass"""
-        return float(
+        return self._as_float(
             1.545
             + 0.250 * self.bmi
-            - 1.343 * self.is_male()
+            - 1.343 * self._male
             - 0.524 * self.left_leg_phaseangle
         )
 
@@ -1166,11 +1461,11 @@ class Fitness(BIAInput):
     @property
     def right_leg_fatfreemass(self):
         """return the right leg fat free mass in kg"""
-        return float(
+        return self._as_float(
             +3.724
             + 0.071 * self.height**2 / self.right_leg_resistance
             - 46.197 * self._trunk_appendicular_index
-            + 0.733 * self.is_male()
+            + 0.733 * self._male
         )
 
     @property
@@ -1183,10 +1478,10 @@ class Fitness(BIAInput):
     @property
     def right_leg_fatmass(self):
         """return the right leg fat mass in kg"""
-        return float(
+        return self._as_float(
             2.731
             + 0.256 * self.bmi
-            - 1.286 * self.is_male()
+            - 1.286 * self._male
             - 0.7 * self.right_leg_phaseangle
         )
 
@@ -1200,16 +1495,7 @@ class Fitness(BIAInput):
     @property
     def total_trunk_fatfreemass(self):
         """return the trunk fat free mass in kg"""
-        return float(
-            -6.19740
-            + 0.20178 * self.weight
-            + 0.00287 * (self.height**2) / self.total_trunk_resistance
-            + 0.01800 * (self.total_trunk_reactance**2)
-            + 0.00003 * (self.height**2) / self.total_trunk_phaseangle
-            + 2.21723 * self.is_male()
-            + 0.00157 * (self.height**2) / self.total_trunk_reactance
-            + 0.00208 * (self.total_trunk_impedance**2)
-        )
+        return self._linear("total_trunk_fatfreemass")
 
     @property
     def total_trunk_fatfreemassperc(self):
@@ -1221,7 +1507,7 @@ class Fitness(BIAInput):
     @property
     def total_trunk_fatmass(self):
         """return the trunk fat mass in kg"""
-        return float(
+        return self._as_float(
             -26.788
             + 0.978 * self.bmi
             + 0.445 * self.total_trunk_resistance
@@ -1305,11 +1591,11 @@ class Standard(Fitness):
             models. Clin Nutr. 2016;35:468–74. doi:10.1016/j.clnu.2015.03.013
             https://www.doi.org/10.1016/j.clnu.2015.03.013
         """
-        return float(
+        return self._as_float(
             0.286
             + 0.195 * (self.height**2) / self.right_body_resistance
             + 0.385 * self.weight
-            + 5.086 * self.is_male()
+            + 5.086 * self._male
         )
 
     @property
@@ -1326,11 +1612,11 @@ class Standard(Fitness):
             Ann Nutr Metab 1 March 1994; 38 (3): 158–165. doi:10.1159/000177806
             https://doi.org/10.1159/000177806
         """
-        return float(
+        return self._as_float(
             -3.32
             + 0.2 * (self.height**2) / self.right_body_resistance
             + 0.005 * (self.height**2) / self.right_body_reactance
-            + 1.86 * (not self.is_male())
+            + 1.86 * (1 - self._male)
             + 0.08 * self.weight
         )
 
@@ -1346,11 +1632,11 @@ class Standard(Fitness):
         athletes using a 4-compartment model. Int J Sports Med. 2021;42:27–32.
         doi:10.1055/a-1179-6236. https://www.doi.org/10.1055/a-1179-6236
         """
-        return float(
+        return self._as_float(
             -2.261
             + 0.327 * (self.height**2) / self.right_body_resistance
             + 0.525 * self.weight
-            + 5.462 * self.is_male()
+            + 5.462 * self._male
         )
 
     @property
@@ -1367,15 +1653,15 @@ class Standard(Fitness):
             28 (5): 542:546. doi:10.1123/ijsnem.2017-0185.
             https://www.doi.org/10.1123/ijsnem.2017-0185
         """
-        return (
+        return self._as_float(
             +0.35966
             + 0.89328
-            * exp(
-                -0.47127 * log(self.right_body_resistance)
-                + 2.65176 * log(self.height)
+            * np.exp(
+                -0.47127 * np.log(self.right_body_resistance)
+                + 2.65176 * np.log(self.height)
                 - 9.62779
             )
-            - 0.12978 * (not self.is_male())
+            - 0.12978 * (1 - self._male)
         )
 
     @property
@@ -1390,10 +1676,10 @@ class Standard(Fitness):
             Physiology 2000 89:2, 465-471. doi: 10.1152/jappl.2000.89.2.465
             https://doi.org/10.1152/jappl.2000.89.2.465
         """
-        return float(
+        return self._as_float(
             +5.102
             + 0.401 * (self.height**2) / self.right_body_resistance
-            + 3.825 * self.is_male()
+            + 3.825 * self._male
             - 0.071 * self.age
         )
 
@@ -1414,12 +1700,12 @@ class Standard(Fitness):
             doi: 10.1093/ajcn/80.5.1379.
             https://www.doi.org/10.1093/ajcn/80.5.1379
         """
-        return float(
+        return self._as_float(
             238.85
             * (
                 +0.05192 * self.total_body_fatfreemass
                 + 0.04036 * self.total_body_fatmass
-                + 0.869 * self.is_male()
+                + 0.869 * self._male
                 - 0.01181 * self.age
                 + 2.992
             )
@@ -1438,11 +1724,11 @@ class Standard(Fitness):
             Eur J Clin Nutr 77, 202–211 (2023). doi: 10.1038/s41430-022-01224-0
             https://doi.org/10.1038/s41430-022-01224-0
         """
-        return float(
+        return self._as_float(
             +0.676
             + 0.026 * self.height**2 / self.left_arm_resistance
             - 11.398 * self._trunk_appendicular_index
-            + 0.346 * self.is_male()
+            + 0.346 * self._male
         )
 
     @property
@@ -1454,11 +1740,11 @@ class Standard(Fitness):
         ----------
         Silva 2024 unpublished
         """
-        return float(
+        return self._as_float(
             -0.420
             + 0.107 * self.bmi
             - 0.216 * self.left_arm_phaseangle
-            - 0.163 * self.is_male()
+            - 0.163 * self._male
         )
 
     @property
@@ -1474,11 +1760,11 @@ class Standard(Fitness):
             Eur J Clin Nutr 77, 202–211 (2023). doi: 10.1038/s41430-022-01224-0
             https://doi.org/10.1038/s41430-022-01224-0
         """
-        return float(
+        return self._as_float(
             +0.676
             + 0.026 * self.height**2 / self.right_arm_resistance
             - 11.398 * self._trunk_appendicular_index
-            + 0.346 * self.is_male()
+            + 0.346 * self._male
         )
 
     @property
@@ -1490,11 +1776,11 @@ class Standard(Fitness):
         ----------
         Silva 2024 unpublished
         """
-        return float(
+        return self._as_float(
             -0.447
             + 0.102 * self.bmi
             - 0.188 * self.right_arm_phaseangle
-            - 0.155 * self.is_male()
+            - 0.155 * self._male
         )
 
     @property
@@ -1510,11 +1796,11 @@ class Standard(Fitness):
             Eur J Clin Nutr 77, 202–211 (2023). doi: 10.1038/s41430-022-01224-0
             https://doi.org/10.1038/s41430-022-01224-0
         """
-        return float(
+        return self._as_float(
             +4.756
             + 0.067 * self.height**2 / self.left_leg_resistance
             - 54.597 * self._trunk_appendicular_index
-            + 0.901 * self.is_male()
+            + 0.901 * self._male
         )
 
     @property
@@ -1526,10 +1812,10 @@ class Standard(Fitness):
         ----------
         Silva 2024 unpublished
         """
-        return float(
+        return self._as_float(
             1.545
             + 0.250 * self.bmi
-            - 1.343 * self.is_male()
+            - 1.343 * self._male
             - 0.524 * self.left_leg_phaseangle
         )
 
@@ -1546,11 +1832,11 @@ class Standard(Fitness):
             Eur J Clin Nutr 77, 202–211 (2023). doi: 10.1038/s41430-022-01224-0
             https://doi.org/10.1038/s41430-022-01224-0
         """
-        return float(
+        return self._as_float(
             +3.724
             + 0.071 * self.height**2 / self.right_leg_resistance
             - 46.197 * self._trunk_appendicular_index
-            + 0.733 * self.is_male()
+            + 0.733 * self._male
         )
 
     @property
@@ -1562,10 +1848,10 @@ class Standard(Fitness):
         ----------
         Silva 2024 unpublished
         """
-        return float(
+        return self._as_float(
             2.731
             + 0.256 * self.bmi
-            - 1.286 * self.is_male()
+            - 1.286 * self._male
             - 0.7 * self.right_leg_phaseangle
         )
 
@@ -1582,7 +1868,7 @@ class Standard(Fitness):
             Eur J Clin Nutr 77, 202–211 (2023). doi: 10.1038/s41430-022-01224-0
             https://doi.org/10.1038/s41430-022-01224-0
         """
-        return float(
+        return self._as_float(
             -10.039
             + 0.015 * (self.height**2) / self.total_trunk_resistance
             + 160.945 * self._trunk_appendicular_index
@@ -1597,7 +1883,7 @@ class Standard(Fitness):
         ----------
         Silva 2024 unpublished
         """
-        return float(
+        return self._as_float(
             -26.788
             + 0.978 * self.bmi
             + 0.445 * self.total_trunk_resistance
@@ -1608,9 +1894,84 @@ class Standard(Fitness):
 class Inbody(Fitness):
 
     _onnx_model: OnnxModel
+    _model_key: str | None
     _model_path = join(dirname(__file__), "assets", "model2_100x2_vs_inbody.onnx")
     _preds: dict[str, float]
 
+    # order is important and defined at model creation
+    _input_labels = [
+        "height",
+        "weight",
+        "age",
+        "sex",
+        "left_arm_resistance",
+        "left_arm_reactance",
+        "left_leg_resistance",
+        "left_leg_reactance",
+        "left_body_resistance",
+        "left_body_reactance",
+        "right_arm_resistance",
+        "right_arm_reactance",
+        "right_leg_resistance",
+        "right_leg_reactance",
+        "right_body_resistance",
+        "right_body_reactance",
+    ]
+
+    # order is important and defined at model creation
+    _output_labels = [
+        "total_body_basalmetabolicrate",
+        "total_body_proteins",
+        "total_body_minerals",
+        "target_weight",
+        "total_body_phaseangle",
+        "total_body_phaseanglecorrected",
+        "total_body_fatmass",
+        "total_body_fatmassperc",
+        "total_body_fatmassindex",
+        "total_body_fatfreemass",
+        "total_body_fatfreemassperc",
+        "total_body_fatfreemassindex",
+        "total_body_bonemineralcontentperc",
+        "total_body_bonemineralcontent",
+        "total_body_softleanmass",
+        "total_body_softleanmassperc",
+        "total_body_skeletalmusclemass",
+        "total_body_skeletalmusclemassperc",
+        "total_body_skeletalmusclemassindex",
+        "left_arm_fatmass",
+        "left_arm_fatmassperc",
+        "left_arm_fatfreemass",
+        "left_arm_fatfreemassperc",
+        "left_leg_fatmass",
+        "left_leg_fatmassperc",
+        "left_leg_fatfreemass",
+        "left_leg_fatfreemassperc",
+        "right_arm_fatmass",
+        "right_arm_fatmassperc",
+        "right_arm_fatfreemass",
+        "right_arm_fatfreemassperc",
+        "right_leg_fatmass",
+        "right_leg_fatmassperc",
+        "right_leg_fatfreemass",
+        "right_leg_fatfreemassperc",
+        "total_trunk_fatmass",
+        "total_trunk_fatmassperc",
+        "total_trunk_fatfreemass",
+        "total_trunk_fatfreemassperc",
+        "total_body_water",
+        "total_body_waterperc",
+        "total_body_extracellularwater",
+        "total_body_extracellularwaterperc",
+        "total_body_intracellularwater",
+        "total_body_intracellularwaterperc",
+        "ecw_on_icw",
+    ]
+
+    # the model is shared by all the instances (see OnnxModel thread-safety)
+    _shared_model: OnnxModel | None = None
+    _shared_model_lock = Lock()
+
     def __init__(
         self,
         height: int,
@@ -1629,6 +1990,7 @@ class Inbody(Fitness):
         right_leg_reactance: int | float,
         right_body_resistance: int | float,
         right_body_reactance: int | float,
+        model: str | None = None,
     ):
         super().__init__(
             age=age,
@@ -1654,183 +2016,178 @@ class Inbody(Fitness):
             corrected_electrical_values=False,
         )
 
-        self._onnx_model = OnnxModel(
-            model_path=self._model_path,
-            input_labels=[  # order is important and defined at model creation
-                "height",
-                "weight",
-                "age",
-                "sex",
-                "left_arm_resistance",
-                "left_arm_reactance",
-                "left_leg_resistance",
-                "left_leg_reactance",
-                "left_body_resistance",
-                "left_body_reactance",
-                "right_arm_resistance",
-                "right_arm_reactance",
-                "right_leg_resistance",
-                "right_leg_reactance",
-                "right_body_resistance",
-                "right_body_reactance",
-            ],
-            output_labels=[  # order is important and defined at model creation
-                "total_body_basalmetabolicrate",
-                "total_body_proteins",
-                "total_body_minerals",
-                "target_weight",
-                "total_body_phaseangle",
-                "total_body_phaseanglecorrected",
-                "total_body_fatmass",
-                "total_body_fatmassperc",
-                "total_body_fatmassindex",
-                "total_body_fatfreemass",
-                "total_body_fatfreemassperc",
-                "total_body_fatfreemassindex",
-                "total_body_bonemineralcontentperc",
-                "total_body_bonemineralcontent",
-                "total_body_softleanmass",
-                "total_body_softleanmassperc",
-                "total_body_skeletalmusclemass",
-                "total_body_skeletalmusclemassperc",
-                "total_body_skeletalmusclemassindex",
-                "left_arm_fatmass",
-                "left_arm_fatmassperc",
-                "left_arm_fatfreemass",
-                "left_arm_fatfreemassperc",
-                "left_leg_fatmass",
-                "left_leg_fatmassperc",
-                "left_leg_fatfreemass",
-                "left_leg_fatfreemassperc",
-                "right_arm_fatmass",
-                "right_arm_fatmassperc",
-                "right_arm_fatfreemass",
-                "right_arm_fatfreemassperc",
-                "right_leg_fatmass",
-                "right_leg_fatmassperc",
-                "right_leg_fatfreemass",
-                "right_leg_fatfreemassperc",
-                "total_trunk_fatmass",
-                "total_trunk_fatmassperc",
-                "total_trunk_fatfreemass",
-                "total_trunk_fatfreemassperc",
-                "total_body_water",
-                "total_body_waterperc",
-                "total_body_extracellularwater",
-                "total_body_extracellularwaterperc",
-                "total_body_intracellularwater",
-                "total_body_intracellularwaterperc",
-                "ecw_on_icw",
-            ],
-        )
+        self._model_key = model
+        self._onnx_model = self._resolve_model(model)
 
-        # get the predictions
+        # get the predictions (batches go through the tuned executor, if any)
         inputs = {i: getattr(self, i) for i in self._onnx_model.input_labels}
-        self._preds = self._onnx_model(inputs)  # type: ignore
+        if all(np.ndim(v) == 0 for v in inputs.values()):
+            self._preds = self._onnx_model(inputs)  # type: ignore
+
+            # single measurements return scalars
+            self._preds = {i: float(v[0]) for i, v in self._preds.items()}
+        else:
+            executor = tuned_executor(self._onnx_model)
+            predict = self._onnx_model if executor is None else executor
+            self._preds = predict(inputs)  # type: ignore
+
+    def __getstate__(self):
+        """
+        return the picklable state of the object: the inputs and the
+        predictions (stored as a single array) without the model.
+        """
+        state = {i: v for i, v in self.__dict__.items() if i not in self._cached}
+        model = state.pop("_onnx_model")
+        preds = state.pop("_preds")
+        state["_preds"] = np.stack([preds[i] for i in model.output_labels])
+        return state
+
+    def __setstate__(self, state: dict):
+        """restore the object and re-attach the model shared by the process"""
+        state = dict(state)
+        preds = state.pop("_preds")
+        self.__dict__.update(state)
+        self._onnx_model = self._resolve_model(self._model_key)
+        self._preds = dict(zip(self._onnx_model.output_labels, preds))
+
+    @classmethod
+    def _resolve_model(cls, model: str | None):
+        """
+        return the default model if model is None, otherwise the model
+        registered with the given "name" or "name:version" key in the
+        default registry
+        """
+        if model is None:
+            return cls.get_model()
+        return default_registry.get(model)
+
+    @classmethod
+    def get_model(cls):
+        """
+        return the OnnxModel used by the class. It is created on first call
+        and then shared by all the instances and threads of the process.
+        """
+        with cls._shared_model_lock:
+            result = "hit" if cls._shared_model is not None else "miss"
+            MODEL_CACHE.inc(cache="shared", result=result)
+            if cls._shared_model is None:
+                cls._shared_model = OnnxModel(
+                    model_path=cls._model_path,
+                    input_labels=cls._input_labels,
+                    output_labels=cls._output_labels,
+                )
+        return cls._shared_model
 
     @property
     def total_body_water(self):
         """return the total body water in liters and as percentage
         of the total body weight"""
-        return float(self._preds["total_body_water"])
+        return self._as_float(self._preds["total_body_water"])
 
     @property
     def total_body_extracellularwater(self):
         """return the extracellular water in liters"""
-        return float(self._preds["total_body_extracellularwater"])
+        return self._as_float(self._preds["total_body_extracellularwater"])
 
     @property
     def total_body_fatfreemass(self):
         """return the free-fat mass in kg"""
-        return float(self._preds["total_body_fatfreemass"])
+        return self._as_float(self._preds["total_body_fatfreemass"])
 
     @property
     def total_body_bonemineralcontent(self):
         """return the bone mineral content in kg"""
-        return float(self._preds["total_body_bonemineralcontent"])
+        return self._as_float(self._preds["total_body_bonemineralcontent"])
 
     @property
     def total_body_skeletalmusclemass(self):
         """return the skeletal muscle mass in kg"""
-        return float(self._preds["total_body_skeletalmusclemass"])
+        return self._as_float(self._preds["total_body_skeletalmusclemass"])
 
     @property
     def total_body_basalmetabolicrate(self):
         """return the basal metabolic rate in kcal"""
-        return float(self._preds["total_body_basalmetabolicrate"])
+        return self._as_float(self._preds["total_body_basalmetabolicrate"])
 
     @property
     def total_body_phaseanglecorrected(self):
-        return self._preds["total_body_phaseanglecorrected"]
+        """return the total body phase angle corrected in degrees"""
+        return self._as_float(self._preds["total_body_phaseanglecorrected"])
 
     @property
     def total_body_minerals(self):
         """return the total body mineral content"""
-        return float(self._preds["total_body_minerals"])
+        return self._as_float(self._preds["total_body_minerals"])
 
     @property
     def total_body_proteins(self):
         """return the total body proteins mass"""
-        return float(self._preds["total_body_proteins"])
+        return self._as_float(self._preds["total_body_proteins"])
 
     @property
     def left_arm_fatfreemass(self):
         """return the left arm fat free mass in kg"""
-        return float(self._preds["left_arm_fatfreemass"])
+        return self._as_float(self._preds["left_arm_fatfreemass"])
 
     @property
     def left_arm_fatmass(self):
         """return the left arm fat mass in kg"""
-        return float(self._preds["left_arm_fatmass"])
+        return self._as_float(self._preds["left_arm_fatmass"])
 
     @property
     def right_arm_fatfreemass(self):
         """return the right arm fat free mass in kg"""
-        return float(self._preds["right_arm_fatfreemass"])
+        return self._as_float(self._preds["right_arm_fatfreemass"])
 
     @property
     def right_arm_fatmass(self):
         """return the right arm fat mass in kg"""
-        return float(self._preds["right_arm_fatmass"])
+        return self._as_float(self._preds["right_arm_fatmass"])
 
     @property
     def left_leg_fatfreemass(self):
         """return the left leg fat free mass in kg"""
-        return float(self._preds["left_leg_fatfreemass"])
+        return self._as_float(self._preds["left_leg_fatfreemass"])
 
     @property
     def left_leg_fatmass(self):
         """return the left leg fat mass in kg and as percentage of
         the as percentage of the total fat mass"""
-        return float(self._preds["left_leg_fatmass"])
+        return self._as_float(self._preds["left_leg_fatmass"])
 
     @property
     def right_leg_fatfreemass(self):
         """return the right leg fat free mass in kg"""
-        return float(self._preds["right_leg_fatfreemass"])
+        return self._as_float(self._preds["right_leg_fatfreemass"])
 
     @property
     def right_leg_fatmass(self):
         """return the right leg fat mass in kg"""
-        return float(self._preds["right_leg_fatmass"])
+        return self._as_float(self._preds["right_leg_fatmass"])
 
     @property
     def total_trunk_fatfreemass(self):
         """return the trunk fat free mass in kg"""
-        return float(self._preds["total_trunk_fatfreemass"])
+        return self._as_float(self._preds["total_trunk_fatfreemass"])
 
     @property
     def total_trunk_fatmass(self):
         """return the trunk fat mass in kg"""
-        return float(self._preds["total_trunk_fatmass"])
+        return self._as_float(self._preds["total_trunk_fatmass"])
 
 
 class CheckupBIA:
     """BIA analysis"""
 
-    _fitness: Fitness
-    _inbody: Inbody
-    _standard: Standard
+    _params: dict
+    _methods: tuple[str, ...]
+    _inbody_model: str | None
+    _fitness: Fitness | None
+    _inbody: Inbody | None
+    _standard: Standard | None
+
+    # the available methodologies
+    _available_methods = ("fitness", "standard", "inbody")
 
     def __init__(
         self,
@@ -1855,8 +2212,11 @@ class CheckupBIA:
         right_body_resistance: int | float,
         right_body_reactance: int | float,
         corrected_electrical_values=False,
+        methods: str | list[str] | tuple[str, ...] = _available_methods,
+        inbody_model: str | None = None,
     ):
-        self._fitness = Fitness(
+        # store the inputs. The methodologies are created on first access
+        self._params = dict(
             height=height,
             weight=weight,
             age=age,
@@ -1879,67 +2239,140 @@ class CheckupBIA:
             right_body_reactance=right_body_reactance,
             corrected_electrical_values=corrected_electrical_values,
         )
-        self._standard = Standard(
-            height=height,
-            weight=weight,
-            age=age,
-            gender=gender,
-            left_arm_resistance=left_arm_resistance,
-            left_arm_reactance=left_arm_reactance,
-            left_leg_resistance=left_leg_resistance,
-            left_leg_reactance=left_leg_reactance,
-            left_trunk_resistance=left_trunk_resistance,
-            left_trunk_reactance=left_trunk_reactance,
-            left_body_resistance=left_body_resistance,
-            left_body_reactance=left_body_reactance,
-            right_arm_resistance=right_arm_resistance,
-            right_arm_reactance=right_arm_reactance,
-            right_leg_resistance=right_leg_resistance,
-            right_leg_reactance=right_leg_reactance,
-            right_trunk_resistance=right_trunk_resistance,
-            right_trunk_reactance=right_trunk_reactance,
-            right_body_resistance=right_body_resistance,
-            right_body_reactance=right_body_reactance,
-            corrected_electrical_values=corrected_electrical_values,
-        )
-        self._inbody = Inbody(
-            height=height,
-            weight=weight,
-            age=age,
-            gender=gender,
-            left_arm_resistance=left_arm_resistance,
-            left_arm_reactance=left_arm_reactance,
-            left_leg_resistance=left_leg_resistance,
-            left_leg_reactance=left_leg_reactance,
-            left_body_resistance=left_body_resistance,
-            left_body_reactance=left_body_reactance,
-            right_arm_resistance=right_arm_resistance,
-            right_arm_reactance=right_arm_reactance,
-            right_leg_resistance=right_leg_resistance,
-            right_leg_reactance=right_leg_reactance,
-            right_body_resistance=right_body_resistance,
-            right_body_reactance=right_body_reactance,
-        )
+        if isinstance(methods, str):
+            methods = [methods]
+        unknown = [i for i in methods if i not in self._available_methods]
+        if len(unknown) > 0:
+            raise ValueError(
+                f"Unknown methods: {unknown}. "
+                + f"Available methods are: {list(self._available_methods)}"
+            )
+        self._methods = tuple(methods)
+        self._inbody_model = inbody_model
+        self._fitness = None
+        self._standard = None
+        self._inbody = None
 
-    def to_dict(self):
-        """return all the measures as dictionary"""
-        return dict(
-            fitness=self.fitness.to_dict(),
-            standard=self.standard.to_dict(),
-            inbody=self.inbody.to_dict(),
-        )
+    @property
+    def methods(self):
+        """return the selected methodologies"""
+        return self._methods
+
+    def to_dict(self, fields: str | list[str] | None = None):
+        """
+        return the measures as dictionary
+
+        Parameters
+        ----------
+        fields: str | list[str] | None = None
+            the measures to be returned. If None, all the available measures
+            are returned. Otherwise each methodology evaluates only the
+            requested measures it provides (and those they depend on).
+        """
+        classes = dict(fitness=Fitness, standard=Standard, inbody=Inbody)
+        if fields is None:
+            return {i: self._evaluate(i) for i in self.methods}
+        if isinstance(fields, str):
+            fields = [fields]
+        available = set().union(*(classes[i].measures() for i in self.methods))
+        unknown = [i for i in fields if i not in available]
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown fields: {unknown}")
+        out = {}
+        for method in self.methods:
+            measures = classes[method].measures()
+            out[method] = self._evaluate(method, [i for i in fields if i in measures])
+        return out
+
+    def _evaluate(self, method: str, fields: list[str] | None = None):
+        """return the measures of a methodology, updating the metrics"""
+        tic = perf_counter()
+        try:
+            out = getattr(self, method).to_dict(fields)
+        except Exception:
+            ERRORS.inc(method=method)
+            raise
+        CHECKUP_SECONDS.observe(perf_counter() - tic, method=method)
+        CHECKUPS.inc(np.size(self._params["weight"]), method=method)
+        return out
 
     @property
     def fitness(self):
         """return the set of fitness-equations based measures"""
+        if self._fitness is None:
+            self._fitness = Fitness(**self._params)
         return self._fitness
 
     @property
     def standard(self):
         """return the set of standard-equations based measures"""
+        if self._standard is None:
+            self._standard = Standard(**self._params)
         return self._standard
 
     @property
     def inbody(self):
-        """return the set of standard-equations based measures"""
+        """return the set of inbody-model based measures"""
+        if self._inbody is None:
+            params = {
+                i: v
+                for i, v in self._params.items()
+                if "_trunk_" not in i and i != "corrected_electrical_values"
+            }
+            self._inbody = Inbody(**params, model=self._inbody_model)
         return self._inbody
+
+
+#! FUNCTIONS
+
+
+def warmup(
+    batch_sizes: list[int] | tuple[int, ...] = (1, 64, 1024),
+    methods: str | list[str] | tuple[str, ...] = CheckupBIA._available_methods,
+):
+    """
+    prepare the process to serve checkups at steady-state speed by loading
+    and optimizing the Inbody model, running synthetic inferences at the
+    given batch sizes and exercising the equations code.
+
+    Parameters
+    ----------
+    batch_sizes: list[int] | tuple[int, ...] = (1, 64, 1024)
+        the batch sizes used for the synthetic inferences
+
+    methods: str | list[str] | tuple[str, ...] = ("fitness", "standard", "inbody")
+        the methodologies to be warmed up. The Inbody model is loaded only if
+        "inbody" is included.
+
+    Returns
+    -------
+    report: dict[str, float]
+        the time in seconds spent by each warm-up step and in total.
+    """
+    if isinstance(methods, str):
+        methods = [methods]
+    report = {}
+    tic = perf_counter()
+
+    # model loading, graph optimization and first-run kernel selection
+    if "inbody" in methods:
+        toc = perf_counter()
+        model = Inbody.get_model()
+        report["model_load"] = perf_counter() - toc
+        sample = {**_SAMPLE, "sex": int(_SAMPLE["gender"] == "M")}
+        sample = np.array(
+            [[sample[i] for i in model.input_labels]],
+            dtype=np.float32,
+        )
+        for size in batch_sizes:
+            toc = perf_counter()
+            model.predict(np.repeat(sample, int(size), axis=0))
+            report[f"inference_{int(size)}"] = perf_counter() - toc
+
+    # equations and python code paths
+    toc = perf_counter()
+    CheckupBIA(**_SAMPLE, methods=methods).to_dict()
+    report["equations"] = perf_counter() - toc
+
+    report["total"] = perf_counter() - tic
+    return report
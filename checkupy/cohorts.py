@@ -0,0 +1,222 @@
+"""
+module dedicated to the grouped summaries of the measures over cohorts,
+computed chunk by chunk with mergeable accumulators
+"""
+
+#! IMPORTS
+
+
+import numpy as np
+import pandas as pd
+
+from .batch import score_batch
+from .checkupy import CheckupBIA
+from .stats import Moments
+
+__all__ = ["AGE_BANDS", "BMI_CLASSES", "CohortSummary"]
+
+
+#! CONSTANTS
+
+
+# lower bounds (years) of the age bands
+AGE_BANDS = (18, 30, 40, 50, 60, 70)
+
+# WHO body mass index classes as (label, lower bound in kg/m2)
+BMI_CLASSES = (
+    ("underweight", -np.inf),
+    ("normal", 18.5),
+    ("overweight", 25.0),
+    ("obese", 30.0),
+)
+
+# the available grouping variables
+_GROUPERS = ("gender", "age_band", "bmi_class")
+
+
+#! FUNCTIONS
+
+
+def _age_band(age: np.ndarray, bands: tuple[int, ...]):
+    """return the age band label of each age"""
+    labels = [f"<{bands[0]}"]
+    labels += [f"{a}-{b - 1}" for a, b in zip(bands[:-1], bands[1:])]
+    labels += [f"{bands[-1]}+"]
+    return np.array(labels, dtype=object)[np.searchsorted(bands, age, side="right")]
+
+
+def _bmi_class(bmi: np.ndarray):
+    """return the WHO class of each body mass index"""
+    labels = np.array([i[0] for i in BMI_CLASSES], dtype=object)
+    bounds = [i[1] for i in BMI_CLASSES[1:]]
+    return labels[np.searchsorted(bounds, bmi, side="right")]
+
+
+#! CLASSES
+
+
+class CohortSummary:
+    """
+    per-cohort count, mean, variance, standard deviation, minimum and
+    maximum of every numeric measure.
+
+    The summary keeps one mergeable accumulator per group, so it requires
+    constant memory whatever the number of measurements. Chunks can be
+    processed by different workers and the partial summaries combined with
+    merge().
+
+    Parameters
+    ----------
+    by: str | list[str] | tuple[str, ...] = ("gender", "age_band", "bmi_class")
+        the grouping variables among "gender", "age_band" and "bmi_class"
+
+    methods: str | list[str] | tuple[str, ...] = ("fitness", "standard", "inbody")
+        the methodologies to be summarized
+
+    fields: str | list[str] | None = None
+        the measures to be summarized. If None, all the numeric measures
+        are summarized.
+
+    age_bands: tuple[int, ...] = AGE_BANDS
+        the lower bounds (years) of the age bands
+
+    corrected_electrical_values: bool = False
+        are the electrical data corrected for orthostatism?
+
+    inbody_model: str | None = None
+        the key of the Inbody model in the default registry
+    """
+
+    _columns: list[tuple[str, str]] | None
+    _groups: dict[tuple, Moments]
+
+    def __init__(
+        self,
+        by: str | list[str] | tuple[str, ...] = _GROUPERS,
+        methods: str | list[str] | tuple[str, ...] = CheckupBIA._available_methods,
+        fields: str | list[str] | None = None,
+        age_bands: tuple[int, ...] = AGE_BANDS,
+        corrected_electrical_values: bool = False,
+        inbody_model: str | None = None,
+    ):
+        by = [by] if isinstance(by, str) else list(by)
+        unknown = [i for i in by if i not in _GROUPERS]
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown grouping variables: {unknown}")
+        self._by = tuple(by)
+        self._methods = (methods,) if isinstance(methods, str) else tuple(methods)
+        self._fields = [fields] if isinstance(fields, str) else fields
+        self._age_bands = tuple(sorted(age_bands))
+        self._corrected = corrected_electrical_values
+        self._inbody_model = inbody_model
+        self._columns = None
+        self._groups = {}
+
+    @property
+    def by(self):
+        """the grouping variables"""
+        return self._by
+
+    def _keys(self, scores: pd.DataFrame):
+        """return the group keys of each row of scores"""
+        method = scores.columns.get_level_values(0)[0]
+        keys = []
+        for i in self._by:
+            if i == "gender":
+                keys.append(np.asarray(scores[(method, "gender")], dtype=object))
+            elif i == "age_band":
+                age = np.asarray(scores[(method, "age")], dtype=float)
+                keys.append(_age_band(age, self._age_bands))
+            else:
+                keys.append(_bmi_class(np.asarray(scores[(method, "bmi")], dtype=float)))
+        return keys
+
+    def update(self, chunk):
+        """
+        score a chunk of measurements and add the results to the summary
+
+        Parameters
+        ----------
+        chunk: pd.DataFrame | dict | pyarrow.Table | pyarrow.RecordBatch | polars.DataFrame
+            the measurements, as accepted by score_batch
+        """
+        fields = self._fields
+        if fields is not None:  # the grouping variables are always required
+            fields = list(dict.fromkeys([*fields, "gender", "age", "bmi"]))
+        scores = score_batch(
+            data=chunk,
+            methods=self._methods,
+            fields=fields,
+            corrected_electrical_values=self._corrected,
+            inbody_model=self._inbody_model,
+        )
+        return self.update_scores(scores)
+
+    def update_scores(self, scores: pd.DataFrame):
+        """
+        add already computed measures (as returned by score_batch, i.e. with
+        (methodology, measure) columns) to the summary
+        """
+        if self._columns is None:
+            numeric = scores.select_dtypes("number").columns
+            self._columns = [
+                i for i in numeric if self._fields is None or i[1] in self._fields
+            ]
+        keys = self._keys(scores)
+        values = scores[self._columns].to_numpy(dtype=float)
+        if len(self._by) == 0:
+            codes, uniques = np.zeros(len(values), dtype=int), [()]
+        else:
+            index = pd.MultiIndex.from_arrays(keys)
+            codes, uniques = pd.factorize(index)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        for i, key in enumerate(uniques):
+            key = tuple(key) if isinstance(key, tuple) else (key,)
+            if key not in self._groups:
+                self._groups[key] = Moments(len(self._columns))
+            self._groups[key].update(values[order[bounds[i] : bounds[i + 1]]])
+        return self
+
+    def merge(self, other: "CohortSummary"):
+        """merge the groups accumulated by another CohortSummary"""
+        if other.by != self.by:
+            raise ValueError("Cannot merge summaries with different groups")
+        if other._columns is None:
+            return self
+        if self._columns is None:
+            self._columns = list(other._columns)
+        elif other._columns != self._columns:
+            raise ValueError("Cannot merge summaries of different measures")
+        for key, moments in other._groups.items():
+            if key not in self._groups:
+                self._groups[key] = Moments(len(self._columns))
+            self._groups[key].merge(moments)
+        return self
+
+    def summary(self):
+        """
+        return the summary as a DataFrame with one row per group and
+        (methodology, measure, statistic) columns, where the statistics are
+        count, mean, var, std, min and max.
+        """
+        stats = ["count", "mean", "var", "std", "min", "max"]
+        if self._columns is None:
+            return pd.DataFrame()
+        keys = sorted(self._groups.keys(), key=lambda x: tuple(map(str, x)))
+        data = []
+        for key in keys:
+            mom = self._groups[key]
+            vmin = np.where(mom.count > 0, mom.min, np.nan)
+            vmax = np.where(mom.count > 0, mom.max, np.nan)
+            row = np.stack([mom.count, mom.mean, mom.var, mom.std, vmin, vmax])
+            data.append(row.T.reshape(-1))
+        if len(self._by) == 0:
+            index = pd.Index(["all"])
+        else:
+            index = pd.MultiIndex.from_tuples(keys, names=list(self._by))
+        columns = pd.MultiIndex.from_tuples(
+            [(*i, j) for i in self._columns for j in stats],
+            names=["method", "measure", "statistic"],
+        )
+        return pd.DataFrame(np.array(data), index=index, columns=columns)
@@ -0,0 +1,127 @@
+"""
+module providing a long-lived local daemon computing checkups over a Unix
+domain socket
+
+The protocol is line-based: each request is a single JSON line
+
+    {"params": {...}, "fields": [...], "methods": [...], "format": "table"}
+
+and is answered by a single JSON line
+
+    {"ok": true, "output": "..."} or {"ok": false, "error": "..."}
+
+where output is the text table ("table" format) or the csv file content
+("csv" format) of the results.
+"""
+
+#! IMPORTS
+
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+
+import pandas as pd
+
+from .checkupy import CheckupBIA, warmup
+from .metrics import DAEMON_REQUESTS, serve_metrics
+
+__all__ = ["results_frame", "serve"]
+
+
+#! FUNCTIONS
+
+
+def results_frame(
+    params: dict,
+    fields: list[str] | None = None,
+    methods: list[str] | None = None,
+):
+    """
+    return the results of a checkup as a DataFrame with one row per measure
+    and one column per methodology
+    """
+    if methods is not None:
+        params = {**params, "methods": methods}
+    bia = CheckupBIA(**params)
+    out = []
+    for i, v in bia.to_dict(fields).items():
+        line = pd.DataFrame(pd.Series(v)).T
+        line.index = pd.Index([i])
+        out.append(line)
+    return pd.concat(out).T
+
+
+def _handle(request: dict):
+    """compute the response to a request"""
+    frame = results_frame(
+        params=request["params"],
+        fields=request.get("fields"),
+        methods=request.get("methods"),
+    )
+    if request.get("format", "table") == "csv":
+        return frame.to_csv()
+    return frame.to_string(index=True)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """answer each JSON line received on the connection"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = dict(ok=True, output=_handle(json.loads(line)))
+                DAEMON_REQUESTS.inc(status="ok")
+            except Exception as exc:
+                response = dict(ok=False, error=f"{type(exc).__name__}: {exc}")
+                DAEMON_REQUESTS.inc(status="error")
+            self.wfile.write((json.dumps(response) + "\n").encode())
+            self.wfile.flush()
+
+
+# Unix domain sockets are not available on every platform (e.g. Windows)
+if hasattr(socket, "AF_UNIX"):
+
+    class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+def serve(socket_path: str, metrics_port: int | None = None):
+    """
+    warm up the process and serve checkups on the given Unix domain socket
+    until interrupted (SIGINT or SIGTERM). A stale socket file left by a
+    previous daemon is replaced, while an error is raised if another daemon
+    is listening. If metrics_port is provided, the metrics are also exposed
+    on http://127.0.0.1:<metrics_port>/metrics.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("the daemon requires Unix domain sockets")
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            raise RuntimeError(f"a daemon is already listening on {socket_path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(socket_path)
+        finally:
+            probe.close()
+
+    # SIGTERM stops the daemon as gracefully as SIGINT
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    warmup()
+    if metrics_port is not None:
+        serve_metrics(metrics_port)
+    with _Server(socket_path, _Handler) as server:
+        os.chmod(socket_path, 0o600)
+        try:
+            server.serve_forever()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            os.remove(socket_path)
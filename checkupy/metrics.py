@@ -0,0 +1,416 @@
+"""
+module providing an in-process registry of Prometheus-style metrics
+
+The library updates the metrics defined here on its hot paths (checkups,
+is_valid failures, input validation errors, onnx inference calls and model
+caches). They can be read in the Prometheus text exposition format via
+metrics_text() or scraped from a local HTTP endpoint started with
+serve_metrics().
+
+Each metric keeps at most max_series label combinations: further
+combinations are accounted under the "_other" label values, so that the
+memory and the exposition size stay bounded whatever the inputs.
+"""
+
+#! IMPORTS
+
+
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+__all__ = [
+    "Counter",
+    "Histogram",
+    "MetricsRegistry",
+    "default_metrics",
+    "metrics_text",
+    "serve_metrics",
+]
+
+
+#! CONSTANTS
+
+
+# the maximum number of label combinations of each metric
+_MAX_SERIES = 64
+
+# the label value replacing the combinations exceeding the limit
+_OVERFLOW = "_other"
+
+# the default buckets of latency histograms (seconds)
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+# the buckets of batch size histograms (rows)
+SIZE_BUCKETS = tuple(float(4**i) for i in range(10))
+
+
+#! FUNCTIONS
+
+
+def _escape(value: str):
+    """escape a label value according to the text exposition format"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = ""):
+    """return the {name="value",...} string of a series"""
+    items = [f'{i}="{_escape(v)}"' for i, v in zip(names, values)]
+    if extra:
+        items.append(extra)
+    return "{" + ",".join(items) + "}" if len(items) > 0 else ""
+
+
+def _number(value: float):
+    """format a sample value (NaN and infinities as +Inf, -Inf and NaN)"""
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+#! CLASSES
+
+
+class _Metric(ABC):
+    """
+    base class of the metrics
+
+    Parameters
+    ----------
+    name: str
+        the metric name
+
+    documentation: str
+        the HELP text of the metric
+
+    labelnames: tuple[str, ...] = ()
+        the names of the labels
+
+    max_series: int = 64
+        the maximum number of label combinations
+
+    registry: MetricsRegistry | None = None
+        the registry whose enabled flag controls the updates
+    """
+
+    _type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        max_series: int = _MAX_SERIES,
+        registry: "MetricsRegistry | None" = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = int(max_series)
+        self._registry = registry
+        self._series = {}
+        self._lock = Lock()
+
+    @property
+    def enabled(self):
+        """are the updates recorded?"""
+        return self._registry is None or self._registry.enabled
+
+    def _key(self, labels: dict):
+        """return the series key of the given labels (lock must be held)"""
+        if set(labels.keys()) != set(self.labelnames):
+            raise ValueError(f"{self.name} requires the labels {self.labelnames}")
+        key = tuple(str(labels[i]) for i in self.labelnames)
+        if key not in self._series and len(self._series) >= self.max_series:
+            key = (_OVERFLOW,) * len(self.labelnames)
+        return key
+
+    def clear(self):
+        """remove all the series"""
+        with self._lock:
+            self._series.clear()
+
+    @abstractmethod
+    def _samples(self):
+        """return the (suffix, labels, value) samples of the metric"""
+
+    def exposition(self):
+        """return the metric in the Prometheus text format"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self._type}",
+        ]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_number(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """monotonically increasing counter"""
+
+    _type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        """increase the counter of the series identified by labels"""
+        if not self.enabled:
+            return
+        if amount < 0:
+            raise ValueError("counters can only be increased")
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        """return the current value of a series"""
+        with self._lock:
+            return self._series.get(tuple(str(labels[i]) for i in self.labelnames), 0)
+
+    def _samples(self):
+        with self._lock:
+            series = dict(self._series)
+        for key, value in sorted(series.items()):
+            yield "", _labels(self.labelnames, key), value
+
+
+class Histogram(_Metric):
+    """
+    histogram of observations with fixed buckets
+
+    Parameters
+    ----------
+    buckets: tuple[float, ...] = LATENCY_BUCKETS
+        the upper bounds of the buckets (+Inf is always added)
+    """
+
+    _type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+        max_series: int = _MAX_SERIES,
+        registry: "MetricsRegistry | None" = None,
+    ):
+        super().__init__(name, documentation, labelnames, max_series, registry)
+        self.buckets = tuple(sorted(float(i) for i in buckets))
+
+    def observe(self, value: float, **labels):
+        """add an observation to the series identified by labels"""
+        if not self.enabled:
+            return
+        # NaN is not lower than any bound: it is only counted by +Inf
+        if math.isnan(value):
+            index = len(self.buckets)
+        else:
+            index = bisect_left(self.buckets, value)
+        with self._lock:
+            key = self._key(labels)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        """return the number of observations of a series"""
+        with self._lock:
+            key = tuple(str(labels[i]) for i in self.labelnames)
+            return self._series[key][2] if key in self._series else 0
+
+    def _samples(self):
+        with self._lock:
+            series = {i: (list(v[0]), v[1], v[2]) for i, v in self._series.items()}
+        bounds = [*self.buckets, float("inf")]
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(bounds, counts):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                yield "_bucket", _labels(self.labelnames, key, le), cumulative
+            yield "_sum", _labels(self.labelnames, key), total
+            yield "_count", _labels(self.labelnames, key), count
+
+
+class MetricsRegistry:
+    """
+    collection of metrics
+
+    Parameters
+    ----------
+    enabled: bool = True
+        if False, the updates of all the metrics are ignored
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = Lock()
+
+    def _add(self, metric: _Metric):
+        """register a metric, returning the existing one with the same name"""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"{metric.name} is already registered")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        max_series: int = _MAX_SERIES,
+    ):
+        """return the counter with the given name, creating it if required"""
+        metric = Counter(name, documentation, labelnames, max_series, self)
+        return self._add(metric)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+        max_series: int = _MAX_SERIES,
+    ):
+        """return the histogram with the given name, creating it if required"""
+        metric = Histogram(name, documentation, labelnames, buckets, max_series, self)
+        return self._add(metric)
+
+    def get(self, name: str):
+        """return the metric with the given name"""
+        return self._metrics[name]
+
+    def clear(self):
+        """reset all the metrics"""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def exposition(self):
+        """return all the metrics in the Prometheus text format"""
+        metrics = sorted(self._metrics.values(), key=lambda x: x.name)
+        return "\n".join(i.exposition() for i in metrics) + "\n"
+
+
+# the registry updated by the library
+default_metrics = MetricsRegistry()
+
+CHECKUPS = default_metrics.counter(
+    "checkupy_checkups_total",
+    "Number of measurements computed by each methodology.",
+    ("method",),
+)
+CHECKUP_SECONDS = default_metrics.histogram(
+    "checkupy_checkup_duration_seconds",
+    "Time spent computing the measures of each methodology.",
+    ("method",),
+)
+ERRORS = default_metrics.counter(
+    "checkupy_errors_total",
+    "Number of failed computations of each methodology.",
+    ("method",),
+)
+INVALID = default_metrics.counter(
+    "checkupy_invalid_measurements_total",
+    "Number of measurements found not valid by is_valid.",
+    ("method",),
+)
+VALIDATION_ERRORS = default_metrics.counter(
+    "checkupy_validation_errors_total",
+    "Number of invalid input values found by the batch validation.",
+    ("field",),
+)
+INFERENCE_ROWS = default_metrics.histogram(
+    "checkupy_inference_batch_rows",
+    "Number of rows of each onnx inference call.",
+    ("model",),
+    buckets=SIZE_BUCKETS,
+)
+INFERENCE_SECONDS = default_metrics.histogram(
+    "checkupy_inference_duration_seconds",
+    "Time spent by each onnx inference call.",
+    ("model",),
+)
+DAEMON_REQUESTS = default_metrics.counter(
+    "checkupy_daemon_requests_total",
+    "Number of requests answered by the daemon by status (ok or error).",
+    ("status",),
+)
+MODEL_CACHE = default_metrics.counter(
+    "checkupy_model_cache_total",
+    "Lookups of the onnx sessions cache by result (hit, miss or eviction).",
+    ("cache", "result"),
+)
+
+
+#! FUNCTIONS
+
+
+def metrics_text(registry: MetricsRegistry | None = None):
+    """return the metrics in the Prometheus text exposition format"""
+    return (default_metrics if registry is None else registry).exposition()
+
+
+def serve_metrics(
+    port: int = 9464,
+    host: str = "127.0.0.1",
+    registry: MetricsRegistry | None = None,
+):
+    """
+    expose the metrics on http://host:port/metrics from a background
+    thread.
+
+    Returns
+    -------
+    server: ThreadingHTTPServer
+        the running server. Call server.shutdown() to stop it.
+    """
+    registry = default_metrics if registry is None else registry
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.exposition().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
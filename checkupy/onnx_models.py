@@ -5,27 +5,170 @@ module allowing to use onnx models
 #! IMPORTS
 
 
+from concurrent.futures import ThreadPoolExecutor
+from os import cpu_count
+from os.path import basename, splitext
+from threading import Lock
+from time import perf_counter
+
 import numpy as np
-import onnx
 import pandas as pd
-from onnxruntime import InferenceSession
 import json
 
+from .adapters import as_columns, is_columnar
+from .metrics import INFERENCE_ROWS, INFERENCE_SECONDS
+from .tuning import _is_tuned, load_tuning
+
+__all__ = ["OnnxModel", "BatchExecutor", "preload_model", "tuned_executor"]
+
+
+#! CONSTANTS
+
+
+# model files preloaded in memory (see preload_model)
+_BUFFERS: dict[str, bytes] = {}
+_BUFFERS_LOCK = Lock()
+
+# guards the creation of the tuned executors (see tuned_executor)
+_EXECUTORS_LOCK = Lock()
+
+
+#! FUNCTIONS
+
+
+def preload_model(model_path: str):
+    """
+    read a model file into memory. OnnxModel objects created afterwards on
+    the same path build their session from these bytes instead of reading
+    the disk again (onnxruntime parses its own copy of the model, so the
+    bytes are not shared with the sessions).
+
+    Returns
+    -------
+    buffer: bytes
+        the model bytes.
+    """
+    with _BUFFERS_LOCK:
+        if model_path not in _BUFFERS:
+            with open(model_path, "rb") as f:
+                _BUFFERS[model_path] = f.read()
+        return _BUFFERS[model_path]
+
+
+def _model_source(model_path: str):
+    """return the preloaded model bytes if available, otherwise the path"""
+    return _BUFFERS.get(model_path, model_path)
+
+
+def tuned_executor(model: "OnnxModel"):
+    """
+    return the BatchExecutor running model with the tuned configuration
+    (see tune), or None if the host has not been tuned.
+
+    chunk_size, max_workers and intra_op_num_threads were measured together,
+    hence they are applied together: if the tuned intra_op_num_threads
+    differs from that of model, the executor runs a dedicated session of the
+    same model file, so that the shared session keeps its own setting. The
+    executor is kept by model and created again only when the configuration
+    changes.
+    """
+    if not _is_tuned():
+        return None
+    tuned = load_tuning()
+    threads = tuned["intra_op_num_threads"]
+    key = tuple(sorted(tuned.items()))
+    with _EXECUTORS_LOCK:
+        executor = model._executors.get(key)
+        if executor is None:
+            session = model
+            if threads is not None and threads != model._intra_op_num_threads:
+                session = OnnxModel(
+                    model_path=model.model_path,
+                    input_labels=model.input_labels,
+                    output_labels=model.output_labels,
+                    intra_op_num_threads=threads,
+                )
+            executor = BatchExecutor(
+                session, tuned["chunk_size"], tuned["max_workers"]
+            )
+            model._executors = {key: executor}
+        return executor
+
+
 #! CLASSES
 
 
 class OnnxModel:
+    """
+    wrapper around an onnx model.
+
+    Notes
+    -----
+    The object is thread-safe: the inference session is created once at
+    initialization and never modified afterwards, while
+    onnxruntime guarantees that concurrent calls to InferenceSession.run on
+    the same session are safe (the GIL is released during the run).
+    Therefore a single OnnxModel can be shared by any number of threads.
+
+    Parameters
+    ----------
+    model_path: str
+        the path to the onnx file
+
+    input_labels: list[str]
+        the ordered labels of the model input features
+
+    output_labels: list[str]
+        the ordered labels of the model outputs
+
+    intra_op_num_threads: int | None = None
+        the number of threads used by onnxruntime within each inference
+        call. If None, onnxruntime default is used. Set it to 1 when the
+        model is shared by a BatchExecutor to avoid oversubscription.
+    """
+
     def __init__(
         self,
         model_path: str,
         input_labels: list[str],
         output_labels: list[str],
+        intra_op_num_threads: int | None = None,
     ):
         self.model_path = model_path
         self._input_labels = input_labels
         self._output_labels = output_labels
-        self.session = InferenceSession(model_path)
-        self.model = onnx.load(model_path)
+        self._model = None
+        self._lock = Lock()
+        self._executors: dict[tuple, BatchExecutor] = {}
+
+        # onnxruntime is imported here so that equation-only users never
+        # load it
+        from onnxruntime import InferenceSession, SessionOptions
+
+        options = SessionOptions()
+        self._intra_op_num_threads = intra_op_num_threads
+        if intra_op_num_threads is not None:
+            options.intra_op_num_threads = int(intra_op_num_threads)
+        self.session = InferenceSession(
+            _model_source(model_path),
+            sess_options=options,
+        )
+        self._input_name = self.session.get_inputs()[0].name
+        self._metric_label = splitext(basename(str(model_path)))[0]
+
+    @property
+    def model(self):
+        """the onnx model proto (loaded on first access)"""
+        with self._lock:
+            if self._model is None:
+                import onnx
+
+                source = _model_source(self.model_path)
+                if isinstance(source, bytes):
+                    self._model = onnx.load_from_string(source)
+                else:
+                    self._model = onnx.load(source)
+        return self._model
 
     @property
     def input_labels(self):
@@ -35,9 +178,18 @@ class OnnxModel:
     def output_labels(self):
         return self._output_labels
 
-    def predict(self, data):
+    def _to_matrix(self, data):
+        """
+        convert the input data into a float32 (N, F) matrix
 
-        # check the inputs
+        Returns
+        -------
+        vals: np.ndarray
+            the input matrix
+
+        source: str
+            the type of the input data
+        """
         target_cols = len(self._input_labels)
         wrong_cols = f"Expected input tensor with shape (N, {target_cols})"
         col_list = f"DataFrame must contain columns: {self._input_labels}"
@@ -45,16 +197,17 @@ class OnnxModel:
         if isinstance(data, np.ndarray):
             if data.ndim != 2 or data.shape[1] != target_cols:
                 raise ValueError(wrong_cols)
-            vals = data.astype(np.float32)
-            source = "ndarray"
+            return data.astype(np.float32), "ndarray"
 
-        elif isinstance(data, pd.DataFrame):
+        if isinstance(data, pd.DataFrame):
             if not all(label in data.columns for label in self._input_labels):
                 raise ValueError(col_list)
-            vals = data[self._input_labels].values.astype(np.float32)
-            source = "dataframe"
+            return data[self._input_labels].values.astype(np.float32), "dataframe"
+
+        if is_columnar(data):
+            data = as_columns(data, self._input_labels)
 
-        elif isinstance(data, dict):
+        if isinstance(data, dict):
             if not all(label in data.keys() for label in self._input_labels):
                 raise ValueError(col_list)
             vals = []
@@ -65,17 +218,12 @@ class OnnxModel:
                     arr = np.atleast_1d(data[i]).astype(np.float32).flatten()
                     vals.append(arr)
             vals = np.concatenate([i.reshape(-1, 1) for i in vals], axis=1)
-            vals = vals.astype(np.float32)
-            source = "dict"
+            return vals.astype(np.float32), "dict"
 
-        else:
-            raise TypeError("Unsupported input type")
-
-        # make the inference
-        inputs = {self.session.get_inputs()[0].name: vals}
-        outputs = self.session.run(None, inputs)[0]
+        raise TypeError("Unsupported input type")
 
-        # adjust the outputs
+    def _from_matrix(self, outputs: np.ndarray, source: str, data):
+        """convert the output matrix in the same format of the input data"""
         if source == "ndarray":
             return outputs
 
@@ -94,5 +242,182 @@ class OnnxModel:
 
         raise TypeError("Unsupported output type")
 
+    def _run(self, vals: np.ndarray):
+        """make the inference on a float32 (N, F) matrix"""
+        tic = perf_counter()
+        out = self.session.run(None, {self._input_name: vals})[0]
+        INFERENCE_SECONDS.observe(perf_counter() - tic, model=self._metric_label)
+        INFERENCE_ROWS.observe(len(vals), model=self._metric_label)
+        return out
+
+    def predict(self, data):
+        vals, source = self._to_matrix(data)
+        return self._from_matrix(self._run(vals), source, data)  # type: ignore
+
     def __call__(self, data):
         return self.predict(data)
+
+
+class BatchExecutor:
+    """
+    make predictions on large inputs by splitting them into chunks
+    processed concurrently by a pool of threads sharing the same OnnxModel
+    (and thus the same inference session).
+
+    Parameters
+    ----------
+    model: OnnxModel
+        the model used for the predictions
+
+    chunk_size: int | None = None
+        the maximum number of rows processed by each inference call. If
+        None, the tuned value (see tune) or 1024 is used.
+
+    max_workers: int | None = None
+        the number of threads. If None, the tuned value or the number of
+        available cpus is used.
+    """
+
+    _report: dict[str, float | int]
+
+    def __init__(
+        self,
+        model: OnnxModel,
+        chunk_size: int | None = None,
+        max_workers: int | None = None,
+    ):
+        tuned = load_tuning()
+        chunk_size = tuned["chunk_size"] if chunk_size is None else chunk_size
+        max_workers = tuned["max_workers"] if max_workers is None else max_workers
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+        self._model = model
+        self._chunk_size = int(chunk_size)
+        self._max_workers = int(max_workers or cpu_count() or 1)
+        self._report = {}
+
+    @property
+    def model(self):
+        """the model used for the predictions"""
+        return self._model
+
+    @property
+    def chunk_size(self):
+        """the maximum number of rows processed by each inference call"""
+        return self._chunk_size
+
+    @property
+    def max_workers(self):
+        """the number of threads used for the predictions"""
+        return self._max_workers
+
+    @property
+    def input_labels(self):
+        return self._model.input_labels
+
+    @property
+    def output_labels(self):
+        return self._model.output_labels
+
+    @property
+    def report(self):
+        """
+        return the statistics of the last prediction:
+
+            rows: the number of processed rows
+            chunks: the number of chunks
+            workers: the number of threads actually used
+            wall_time: the elapsed time in seconds
+            busy_time: the sum of the inference time of each chunk in seconds
+            concurrency: busy_time / wall_time, i.e. the average number of
+                chunks running at the same time
+            throughput: the number of rows processed per second
+        """
+        return dict(self._report)
+
+    def scaling(self, data, workers: list[int] | None = None):
+        """
+        measure the achieved scaling by predicting data with an increasing
+        number of threads.
+
+        Parameters
+        ----------
+        data: np.ndarray | pd.DataFrame | dict
+            the benchmark input data
+
+        workers: list[int] | None = None
+            the number of threads to be tested. If None, powers of 2 up to
+            max_workers are used.
+
+        Returns
+        -------
+        scaling: dict[int, dict[str, float]]
+            for each number of threads, the wall time, the throughput and the
+            speedup and the parallel efficiency with respect to a single
+            thread.
+        """
+        if workers is None:
+            workers = [1]
+            while workers[-1] * 2 <= self._max_workers:
+                workers.append(workers[-1] * 2)
+        out = {}
+        for n in [1] + [i for i in workers if i != 1]:
+            _, report = self._predict(data, int(n))
+            out[n] = dict(
+                wall_time=report["wall_time"],
+                throughput=report["throughput"],
+            )
+        base = out[1]["wall_time"]
+        for n, v in out.items():
+            v["speedup"] = base / v["wall_time"] if v["wall_time"] > 0 else 1.0
+            v["efficiency"] = v["speedup"] / n
+        return {i: out[i] for i in workers}
+
+    def _timed_run(self, vals: np.ndarray):
+        """run the inference on a chunk returning the outputs and the time"""
+        tic = perf_counter()
+        out = self._model._run(vals)
+        return out, perf_counter() - tic
+
+    def _predict(self, data, max_workers: int):
+        """
+        make the predictions with at most max_workers threads, returning
+        them (in the same format of data) and the statistics of the run
+        """
+        tic = perf_counter()
+        vals, source = self._model._to_matrix(data)
+        chunks = [
+            vals[i : i + self._chunk_size]
+            for i in range(0, max(len(vals), 1), self._chunk_size)
+        ]
+        workers = min(max_workers, len(chunks))
+        if workers <= 1:
+            results = [self._timed_run(i) for i in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(self._timed_run, chunks))
+        outputs = np.concatenate([i[0] for i in results], axis=0)
+        wall_time = perf_counter() - tic
+        busy_time = float(sum(i[1] for i in results))
+        report = dict(
+            rows=len(vals),
+            chunks=len(chunks),
+            workers=workers,
+            wall_time=wall_time,
+            busy_time=busy_time,
+            concurrency=busy_time / wall_time if wall_time > 0 else 1.0,
+            throughput=len(vals) / wall_time if wall_time > 0 else 0.0,
+        )
+        return self._model._from_matrix(outputs, source, data), report
+
+    def predict(self, data):
+        """
+        make the predictions returning them in the same format of data
+        and in the same order of the input rows
+        """
+        out, self._report = self._predict(data, self._max_workers)
+        return out
+
+    def __call__(self, data):
+        return self.predict(data)
+
@@ -0,0 +1,94 @@
+"""
+module providing the initialization hook of pre-forking servers
+
+Calling prefork() in the parent process before forking the workers loads
+the heavy modules and builds the Inbody inference session once. The workers
+then share these pages copy-on-write instead of loading their own copy, so
+the resident memory does not scale with the number of workers.
+"""
+
+#! IMPORTS
+
+
+import gc
+from time import perf_counter
+
+from .checkupy import Inbody, warmup
+from .onnx_models import OnnxModel, preload_model
+
+__all__ = ["prefork"]
+
+
+#! FUNCTIONS
+
+
+def prefork(
+    model_paths: list[str] | tuple[str, ...] = (),
+    intra_op_num_threads: int = 1,
+    freeze: bool = True,
+):
+    """
+    prepare the parent process of a pre-forking server.
+
+    Parameters
+    ----------
+    model_paths: list[str] | tuple[str, ...] = ()
+        additional onnx files (e.g. those registered in default_registry)
+        to be preloaded in memory. The sessions created on them by the
+        workers read the model from memory rather than from the disk (each
+        session still parses its own copy).
+
+    intra_op_num_threads: int = 1
+        the number of threads of the shared Inbody session. onnxruntime
+        thread pools do not survive fork(), hence the default single thread
+        (the workers provide the parallelism).
+
+    freeze: bool = True
+        if True, the objects created so far are moved to the permanent
+        generation of the garbage collector (gc.freeze), so that the
+        collections in the workers do not write to (and thus copy) the
+        shared pages.
+
+    Returns
+    -------
+    report: dict[str, float]
+        the time in seconds spent by each step and in total.
+    """
+    report = {}
+    tic = perf_counter()
+
+    # heavy imports
+    toc = perf_counter()
+    import onnxruntime  # noqa: F401
+    import pandas  # noqa: F401
+
+    report["imports"] = perf_counter() - toc
+
+    # model bytes in memory
+    toc = perf_counter()
+    for path in (Inbody._model_path, *model_paths):
+        preload_model(path)
+    report["model_bytes"] = perf_counter() - toc
+
+    # the shared Inbody session
+    toc = perf_counter()
+    with Inbody._shared_model_lock:
+        Inbody._shared_model = OnnxModel(
+            model_path=Inbody._model_path,
+            input_labels=Inbody._input_labels,
+            output_labels=Inbody._output_labels,
+            intra_op_num_threads=intra_op_num_threads,
+        )
+    report["session"] = perf_counter() - toc
+
+    # code paths
+    report["warmup"] = warmup()["total"]
+
+    if freeze:
+        toc = perf_counter()
+        gc.collect()
+        gc.freeze()
+        report["freeze"] = perf_counter() - toc
+
+    report["total"] = perf_counter() - tic
+    return report
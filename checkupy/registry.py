@@ -0,0 +1,210 @@
+"""
+module providing a registry of onnx models with lazily created and
+memory-bounded inference sessions
+"""
+
+#! IMPORTS
+
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from os.path import getsize
+from threading import RLock
+from time import time
+
+from .metrics import MODEL_CACHE
+from .onnx_models import OnnxModel
+
+__all__ = ["ModelRegistry", "default_registry"]
+
+
+#! CLASSES
+
+
+class ModelRegistry:
+    """
+    registry mapping model names and versions to onnx files and their
+    input/output labels.
+
+    Sessions are created on first use and kept in memory within the given
+    budget: when a new session exceeds it, the least recently used idle
+    sessions are evicted. A session is idle unless it is being used within
+    a ModelRegistry.use() block. Evicted sessions are freed as soon as no
+    caller holds a reference to them and are transparently re-created when
+    requested again.
+
+    Parameters
+    ----------
+    max_sessions: int | None = None
+        the maximum number of sessions kept in memory. None means no limit.
+
+    max_bytes: int | None = None
+        the maximum memory (estimated as the size of the onnx files) used
+        by the sessions kept in memory. None means no limit.
+
+    Notes
+    -----
+    The registry is thread-safe. If all the sessions are in use, the budget
+    can be temporarily exceeded rather than blocking the callers.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int | None = None,
+        max_bytes: int | None = None,
+    ):
+        self._max_sessions = max_sessions
+        self._max_bytes = max_bytes
+        self._specs: dict[str, dict] = {}
+        self._latest: dict[str, str] = {}
+        self._usage: dict[str, dict] = {}
+        self._loaded: OrderedDict[str, OnnxModel] = OrderedDict()
+        self._lock = RLock()
+
+    def _key(self, name: str, version: str | None = None):
+        """return the registry key of the model"""
+        if version is None:
+            if ":" in name:
+                return name
+            if name not in self._latest:
+                raise KeyError(f"{name} is not registered")
+            return self._latest[name]
+        return f"{name}:{version}"
+
+    def register(
+        self,
+        name: str,
+        version: str,
+        model_path: str,
+        input_labels: list[str],
+        output_labels: list[str],
+        intra_op_num_threads: int | None = None,
+    ):
+        """
+        register a model. No session is created until the model is used.
+        The last registered version of each name is its default version.
+        """
+        if ":" in name or ":" in str(version):
+            raise ValueError("names and versions cannot contain ':'")
+        key = self._key(name, str(version))
+        with self._lock:
+            if key in self._specs:
+                raise ValueError(f"{key} is already registered")
+            self._specs[key] = dict(
+                model_path=model_path,
+                input_labels=list(input_labels),
+                output_labels=list(output_labels),
+                intra_op_num_threads=intra_op_num_threads,
+            )
+            self._latest[name] = key
+            self._usage[key] = dict(
+                loaded=False,
+                bytes=getsize(model_path),
+                calls=0,
+                loads=0,
+                evictions=0,
+                active=0,
+                last_used=None,
+            )
+
+    def models(self):
+        """return the registered models as "name:version" keys"""
+        return list(self._specs.keys())
+
+    def _evict(self, needed_bytes: int = 0):
+        """evict the least recently used idle sessions exceeding the budget"""
+        for key in list(self._loaded.keys()):
+            count = len(self._loaded)
+            size = sum(self._usage[i]["bytes"] for i in self._loaded)
+            over_count = self._max_sessions is not None and count >= self._max_sessions
+            over_bytes = (
+                self._max_bytes is not None and size + needed_bytes > self._max_bytes
+            )
+            if not over_count and not over_bytes:
+                return
+            if self._usage[key]["active"] == 0:
+                self.evict(key)
+
+    def get(self, name: str, version: str | None = None):
+        """
+        return the OnnxModel of the required model, creating its session if
+        required.
+
+        Parameters
+        ----------
+        name: str
+            the model name or its "name:version" key
+
+        version: str | None = None
+            the model version. If None, the last registered version is used.
+        """
+        with self._lock:
+            key = self._key(name, version)
+            if key not in self._specs:
+                raise KeyError(f"{key} is not registered")
+            usage = self._usage[key]
+            result = "hit" if key in self._loaded else "miss"
+            MODEL_CACHE.inc(cache="registry", result=result)
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+            else:
+                self._evict(usage["bytes"])
+                self._loaded[key] = OnnxModel(**self._specs[key])
+                usage["loaded"] = True
+                usage["loads"] += 1
+            usage["calls"] += 1
+            usage["last_used"] = time()
+            return self._loaded[key]
+
+    @contextmanager
+    def use(self, name: str, version: str | None = None):
+        """
+        context manager returning the required OnnxModel and preventing its
+        eviction until the block ends
+        """
+        with self._lock:
+            model = self.get(name, version)
+            key = self._key(name, version)
+            self._usage[key]["active"] += 1
+        try:
+            yield model
+        finally:
+            with self._lock:
+                self._usage[key]["active"] -= 1
+
+    def evict(self, name: str, version: str | None = None):
+        """drop the session of the required model from memory"""
+        with self._lock:
+            key = self._key(name, version)
+            if self._loaded.pop(key, None) is not None:
+                self._usage[key]["loaded"] = False
+                self._usage[key]["evictions"] += 1
+                MODEL_CACHE.inc(cache="registry", result="eviction")
+
+    def clear(self):
+        """drop all the sessions from memory"""
+        with self._lock:
+            for key in list(self._loaded.keys()):
+                self.evict(key)
+
+    def usage(self):
+        """
+        return the usage of each registered model:
+
+            loaded: is its session in memory?
+            bytes: the size of its onnx file
+            calls: the number of times it has been requested
+            loads: the number of times its session has been created
+            evictions: the number of times its session has been evicted
+            active: the number of ModelRegistry.use() blocks using it
+            last_used: the time of the last request (seconds since epoch)
+        """
+        with self._lock:
+            return {i: dict(v) for i, v in self._usage.items()}
+
+
+#! CONSTANTS
+
+
+# the registry used by Inbody to resolve the model argument
+default_registry = ModelRegistry()
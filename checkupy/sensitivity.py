@@ -0,0 +1,139 @@
+"""
+module dedicated to the sensitivity of the equation-based measures to their
+inputs
+"""
+
+#! IMPORTS
+
+
+import numpy as np
+import pandas as pd
+
+from .batch import INPUT_FIELDS, _to_columns
+from .checkupy import CheckupBIA
+
+__all__ = ["NUMERIC_FIELDS", "jacobian"]
+
+
+#! CONSTANTS
+
+
+# the inputs with respect to which the measures can be differentiated
+NUMERIC_FIELDS = tuple(i for i in INPUT_FIELDS if i != "gender")
+
+
+#! FUNCTIONS
+
+
+def jacobian(
+    data: dict | pd.Series | pd.DataFrame,
+    inputs: str | list[str] | None = None,
+    methods: str | list[str] | tuple[str, ...] = ("fitness", "standard"),
+    fields: str | list[str] | None = None,
+    corrected_electrical_values: bool = False,
+    step: float = 1e-20,
+):
+    """
+    return the partial derivatives of the equation-based measures with
+    respect to the inputs.
+
+    The derivatives are obtained by complex-step differentiation: each input
+    is perturbed by an imaginary step and the derivative is read from the
+    imaginary part of the measures. This is exact to machine precision (no
+    subtractive cancellation) and all the inputs and rows are evaluated in a
+    single vectorized pass of the Fitness and Standard equations.
+
+    Parameters
+    ----------
+    data: dict | pd.Series | pd.DataFrame
+        the inputs of a single subject (dict or Series of scalars) or of a
+        batch of subjects (DataFrame or dict of arrays), named as the
+        CheckupBIA arguments.
+
+    inputs: str | list[str] | None = None
+        the inputs with respect to which the measures are differentiated.
+        If None, all the NUMERIC_FIELDS are used.
+
+    methods: str | list[str] | tuple[str, ...] = ("fitness", "standard")
+        the methodologies to be differentiated. Only the equation-based
+        methodologies are supported.
+
+    fields: str | list[str] | None = None
+        the measures to be differentiated. If None, all the available
+        measures are used.
+
+    corrected_electrical_values: bool = False
+        are the electrical data corrected for orthostatism?
+
+    step: float = 1e-20
+        the imaginary step
+
+    Returns
+    -------
+    jac: pd.DataFrame
+        for a single subject, the derivatives indexed by
+        (methodology, measure) with one column per input.
+        For a batch, the derivatives with the same index of data and
+        (methodology, measure, input) columns.
+    """
+    if isinstance(methods, str):
+        methods = [methods]
+    if "inbody" in methods:
+        raise ValueError("the inbody methodology cannot be differentiated")
+    if inputs is None:
+        inputs = list(NUMERIC_FIELDS)
+    elif isinstance(inputs, str):
+        inputs = [inputs]
+    unknown = [i for i in inputs if i not in NUMERIC_FIELDS]
+    if len(unknown) > 0:
+        raise ValueError(f"Cannot differentiate with respect to: {unknown}")
+
+    # single subjects are treated as a batch of one
+    single = isinstance(data, (dict, pd.Series)) and all(
+        np.ndim(data[i]) == 0 for i in INPUT_FIELDS if i in data
+    )
+    if single:
+        data = {i: [v] for i, v in dict(data).items()}
+    columns, index = _to_columns(data, INPUT_FIELDS)
+
+    # stack one copy of the batch per input, each perturbed on its input
+    nrows, ninputs = len(index), len(inputs)
+    params = {}
+    for i, v in columns.items():
+        if i == "gender":
+            params[i] = np.tile(v, ninputs)
+            continue
+        arr = np.tile(v.astype(complex), ninputs)
+        if i in inputs:
+            k = inputs.index(i)
+            arr[k * nrows : (k + 1) * nrows] += 1j * step
+        params[i] = arr
+    checkup = CheckupBIA(
+        **params,
+        corrected_electrical_values=corrected_electrical_values,
+        methods=methods,
+    )
+
+    # collect the derivatives as (rows, inputs) blocks
+    blocks = {}
+    for method, values in checkup.to_dict(fields).items():
+        for measure, value in values.items():
+            value = np.broadcast_to(value, (nrows * ninputs,))
+            if value.dtype.kind not in "iufc":
+                continue
+            der = np.imag(value) / step if value.dtype.kind == "c" else 0 * value
+            blocks[(method, measure)] = der.reshape(ninputs, nrows).T
+
+    if single:
+        return pd.DataFrame(
+            data=np.stack([v[0] for v in blocks.values()]),
+            index=pd.MultiIndex.from_tuples(list(blocks.keys())),
+            columns=inputs,
+        )
+    return pd.DataFrame(
+        data=np.concatenate(list(blocks.values()), axis=1),
+        index=index,
+        columns=pd.MultiIndex.from_tuples(
+            [(*k, i) for k in blocks.keys() for i in inputs]
+        ),
+    )
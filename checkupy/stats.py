@@ -0,0 +1,228 @@
+"""
+module providing single-pass, numerically stable and mergeable accumulators
+
+All the accumulators are vectorized over a set of columns, ignore missing
+(NaN) values column by column and can be updated chunk by chunk and merged
+across chunks, threads or processes (they are picklable) using the pairwise
+formulas of Chan, Golub and LeVeque (1979).
+"""
+
+#! IMPORTS
+
+
+import numpy as np
+
+__all__ = ["Moments", "CoMoments"]
+
+
+#! FUNCTIONS
+
+
+def _as_matrix(values, n_columns: int):
+    """return values as a float64 (N, n_columns) matrix"""
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values.reshape(-1, 1) if n_columns == 1 else values.reshape(1, -1)
+    if values.ndim != 2 or values.shape[1] != n_columns:
+        raise ValueError(f"Expected values with shape (N, {n_columns})")
+    return values
+
+
+def _chunk_mean(values: np.ndarray, mask: np.ndarray, count: np.ndarray):
+    """return the column means of the masked values (0 for empty columns)"""
+    total = np.where(mask, values, 0.0).sum(axis=0)
+    return np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+
+
+def _merge_weights(n_a: np.ndarray, n_b: np.ndarray):
+    """return the total count and the weights of the pairwise merge"""
+    n = n_a + n_b
+    safe = np.where(n > 0, n, 1)
+    return n, n_b / safe, n_a * n_b / safe
+
+
+#! CLASSES
+
+
+class Moments:
+    """
+    mergeable count, mean, variance, minimum and maximum of a set of columns
+
+    Parameters
+    ----------
+    n_columns: int
+        the number of columns
+    """
+
+    def __init__(self, n_columns: int):
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+
+    @property
+    def n_columns(self):
+        """the number of columns"""
+        return len(self.count)
+
+    def _combine(self, count, mean, m2, vmin, vmax):
+        """merge the moments of another set of samples"""
+        n, w, w2 = _merge_weights(self.count, count)
+        delta = mean - self.mean
+        self.mean = self.mean + delta * w
+        self.m2 = self.m2 + m2 + delta**2 * w2
+        self.count = n
+        self.min = np.minimum(self.min, vmin)
+        self.max = np.maximum(self.max, vmax)
+
+    def update(self, values):
+        """
+        add a chunk of samples
+
+        Parameters
+        ----------
+        values: array-like
+            a (N, n_columns) matrix of samples. NaNs are ignored.
+        """
+        values = _as_matrix(values, self.n_columns)
+        mask = np.isfinite(values)
+        count = mask.sum(axis=0).astype(float)
+        mean = _chunk_mean(values, mask, count)
+        m2 = np.where(mask, values - mean, 0.0)
+        m2 = (m2**2).sum(axis=0)
+        vmin = np.where(mask, values, np.inf).min(axis=0, initial=np.inf)
+        vmax = np.where(mask, values, -np.inf).max(axis=0, initial=-np.inf)
+        self._combine(count, mean, m2, vmin, vmax)
+        return self
+
+    def merge(self, other: "Moments"):
+        """merge the samples accumulated by another Moments object"""
+        if other.n_columns != self.n_columns:
+            raise ValueError("Cannot merge Moments with different columns")
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    @property
+    def var(self):
+        """the sample variance of each column"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    @property
+    def std(self):
+        """the sample standard deviation of each column"""
+        return self.var**0.5
+
+
+class CoMoments:
+    """
+    mergeable joint moments of paired columns (x, y): counts, means,
+    variances and covariance computed on the pairs where both values are
+    available
+
+    Parameters
+    ----------
+    n_columns: int
+        the number of paired columns
+    """
+
+    def __init__(self, n_columns: int):
+        self.count = np.zeros(n_columns)
+        self.mean_x = np.zeros(n_columns)
+        self.mean_y = np.zeros(n_columns)
+        self.m2_x = np.zeros(n_columns)
+        self.m2_y = np.zeros(n_columns)
+        self.c_xy = np.zeros(n_columns)
+
+    @property
+    def n_columns(self):
+        """the number of paired columns"""
+        return len(self.count)
+
+    def _combine(self, count, mean_x, mean_y, m2_x, m2_y, c_xy):
+        """merge the joint moments of another set of pairs"""
+        n, w, w2 = _merge_weights(self.count, count)
+        dx = mean_x - self.mean_x
+        dy = mean_y - self.mean_y
+        self.mean_x = self.mean_x + dx * w
+        self.mean_y = self.mean_y + dy * w
+        self.m2_x = self.m2_x + m2_x + dx**2 * w2
+        self.m2_y = self.m2_y + m2_y + dy**2 * w2
+        self.c_xy = self.c_xy + c_xy + dx * dy * w2
+        self.count = n
+
+    def update(self, x, y):
+        """
+        add a chunk of pairs
+
+        Parameters
+        ----------
+        x, y: array-like
+            (N, n_columns) matrices of paired samples. Pairs with a NaN are
+            ignored.
+        """
+        x = _as_matrix(x, self.n_columns)
+        y = _as_matrix(y, self.n_columns)
+        if x.shape != y.shape:
+            raise ValueError("x and y must have the same shape")
+        mask = np.isfinite(x) & np.isfinite(y)
+        count = mask.sum(axis=0).astype(float)
+        mean_x = _chunk_mean(x, mask, count)
+        mean_y = _chunk_mean(y, mask, count)
+        dx = np.where(mask, x - mean_x, 0.0)
+        dy = np.where(mask, y - mean_y, 0.0)
+        self._combine(
+            count,
+            mean_x,
+            mean_y,
+            (dx**2).sum(axis=0),
+            (dy**2).sum(axis=0),
+            (dx * dy).sum(axis=0),
+        )
+        return self
+
+    def merge(self, other: "CoMoments"):
+        """merge the pairs accumulated by another CoMoments object"""
+        if other.n_columns != self.n_columns:
+            raise ValueError("Cannot merge CoMoments with different columns")
+        self._combine(
+            other.count,
+            other.mean_x,
+            other.mean_y,
+            other.m2_x,
+            other.m2_y,
+            other.c_xy,
+        )
+        return self
+
+    def _sample(self, value):
+        """return value / (count - 1), or NaN with less than two pairs"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, value / (self.count - 1), np.nan)
+
+    @property
+    def var_x(self):
+        """the sample variance of x"""
+        return self._sample(self.m2_x)
+
+    @property
+    def var_y(self):
+        """the sample variance of y"""
+        return self._sample(self.m2_y)
+
+    @property
+    def cov(self):
+        """the sample covariance of x and y"""
+        return self._sample(self.c_xy)
+
+    @property
+    def var_diff(self):
+        """the sample variance of x - y"""
+        return self._sample(np.maximum(self.m2_x + self.m2_y - 2 * self.c_xy, 0))
+
+    @property
+    def corr(self):
+        """the Pearson correlation between x and y"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.c_xy / (self.m2_x * self.m2_y) ** 0.5
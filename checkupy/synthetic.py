@@ -0,0 +1,262 @@
+"""
+module dedicated to the generation of synthetic populations of measurements
+for load and scale testing
+"""
+
+#! IMPORTS
+
+
+from typing import Iterator, Literal
+
+import numpy as np
+import pandas as pd
+
+from .batch import INPUT_FIELDS
+from .checkupy import BIAInput
+
+__all__ = ["synthetic_population", "synthetic_chunks"]
+
+
+#! CONSTANTS
+
+
+# segment resistance as fraction of the body resistance (mean, sd)
+_RESISTANCE_FRACTIONS = dict(
+    arm=(0.55, 0.025),
+    leg=(0.42, 0.025),
+    trunk=(0.0215, 0.002),
+)
+
+# segment phase angle as ratio of the body phase angle (mean, sd)
+_PHASEANGLE_RATIOS = dict(
+    arm=(0.84, 0.04),
+    leg=(0.78, 0.04),
+    trunk=(4.4, 0.4),
+)
+
+# the ranges within which the body readings of the valid rows are drawn
+# (slightly narrower than those checked by BIAInput.is_valid)
+_RESISTANCE_INDEX_RANGE = (215.0, 585.0)  # Ohm / m
+_PHASEANGLE_RANGE = (3.3, 11.5)  # degrees
+_MAX_ASYMMETRY = 0.7  # degrees
+
+_OUTPUTS = ("dataframe", "dict", "arrow", "polars")
+
+
+#! FUNCTIONS
+
+
+def _phaseangle(res: np.ndarray, rea: np.ndarray):
+    """return the phase angle in degrees"""
+    return np.degrees(np.arctan(rea / res))
+
+
+def _valid_mask(data: dict[str, np.ndarray]):
+    """
+    return the rows passing BIAInput.is_valid both on the raw readings
+    (fitness and inbody methodologies) and on the orthostatic-corrected
+    readings (standard methodology)
+    """
+    hgt = data["height"] / 100
+    valid = np.ones(len(hgt), dtype=bool)
+    for corrected in (False, True):
+        pha = {}
+        for side in ("left", "right"):
+            res = data[f"{side}_body_resistance"]
+            rea = data[f"{side}_body_reactance"]
+            if corrected:
+                beta = getattr(BIAInput, f"_{side}_body_resistance_betas")
+                res = beta[0] + beta[1] * res
+                beta = getattr(BIAInput, f"_{side}_body_reactance_betas")
+                rea = beta[0] + beta[1] * rea
+            pha[side] = _phaseangle(res, rea)
+            valid &= (res / hgt >= 200) & (res / hgt <= 600)
+            valid &= (rea / hgt >= 10) & (rea / hgt <= 60)
+            valid &= (pha[side] >= 3) & (pha[side] <= 12)
+        valid &= np.abs(pha["left"] - pha["right"]) <= 1
+    return valid
+
+
+def _body(hgt: np.ndarray, res_index: np.ndarray, pha: np.ndarray):
+    """return the body resistance and reactance of one side"""
+    res_index = np.clip(res_index, *_RESISTANCE_INDEX_RANGE)
+    pha = np.clip(pha, *_PHASEANGLE_RANGE)
+
+    # the reactance index must lie within (10, 60) Ohm / m
+    rea_index = np.clip(res_index * np.tan(np.radians(pha)), 11.0, 58.0)
+    return res_index * hgt, rea_index * hgt
+
+
+def _segments(rng: np.random.Generator, res: np.ndarray, rea: np.ndarray):
+    """return the segment readings of one side given its body readings"""
+    n = len(res)
+    pha = _phaseangle(res, rea)
+    out = {}
+    for segment, (mean, sd) in _RESISTANCE_FRACTIONS.items():
+        seg_res = res * np.clip(rng.normal(mean, sd, n), mean / 2, mean * 1.5)
+        mean, sd = _PHASEANGLE_RATIOS[segment]
+        seg_pha = pha * np.clip(rng.normal(mean, sd, n), mean / 2, mean * 1.5)
+        seg_pha = np.clip(seg_pha, 0.5, 45.0)
+        out[segment] = (seg_res, seg_res * np.tan(np.radians(seg_pha)))
+    return out
+
+
+def _generate(
+    rng: np.random.Generator,
+    n: int,
+    valid_rate: float,
+    male_rate: float,
+    age_range: tuple[int, int],
+):
+    """return a dict with the 20 input fields of n synthetic measurements"""
+    male = rng.random(n) < male_rate
+    age = rng.integers(age_range[0], age_range[1] + 1, n)
+
+    # anthropometry: sex-specific height shrinking after 40 and a BMI
+    # growing with age
+    hgt = np.where(male, rng.normal(176.0, 7.0, n), rng.normal(163.0, 6.5, n))
+    hgt -= 0.08 * np.maximum(age - 40, 0)
+    hgt = np.clip(np.round(hgt), 140, 210)
+    bmi_median = 22.0 + 0.08 * (age - 18) + 1.0 * male
+    bmi = np.clip(bmi_median * np.exp(rng.normal(0.0, 0.14, n)), 15.0, 50.0)
+    wgt = np.round(bmi * (hgt / 100) ** 2, 1)
+
+    # body readings: women and fat subjects have higher resistance indices,
+    # while the phase angle decreases with age. The right side mirrors the
+    # left one with small deviations.
+    res_index = np.where(male, 290.0, 360.0) * (bmi / 23.0) ** 0.3
+    res_index *= np.exp(rng.normal(0.0, 0.1, n))
+    pha = np.where(male, 6.8, 6.0) - 0.025 * np.maximum(age - 30, 0)
+    pha += rng.normal(0.0, 0.6, n)
+    hgt_m = hgt / 100
+    left = _body(hgt_m, res_index, pha)
+    asym = np.clip(rng.normal(0.0, 0.2, n), -_MAX_ASYMMETRY, _MAX_ASYMMETRY)
+    res_r = res_index * np.exp(rng.normal(0.0, 0.015, n))
+    right = _body(hgt_m, res_r, _phaseangle(*left) + asym)
+
+    data = {"height": hgt, "weight": wgt, "age": age}
+    data["gender"] = np.where(male, "M", "F").astype(object)
+    for side, (res, rea) in [("left", left), ("right", right)]:
+        for segment, (seg_res, seg_rea) in _segments(rng, res, rea).items():
+            data[f"{side}_{segment}_resistance"] = np.round(seg_res, 1)
+            data[f"{side}_{segment}_reactance"] = np.round(seg_rea, 1)
+        data[f"{side}_body_resistance"] = np.round(res, 1)
+        data[f"{side}_body_reactance"] = np.round(rea, 1)
+
+    # the rows drawn too close to the validity bounds are replaced by other
+    # valid rows
+    valid = _valid_mask(data)
+    if not valid.all() and valid.any():
+        source = rng.choice(np.flatnonzero(valid), int((~valid).sum()))
+        for key in data:
+            data[key][~valid] = data[key][source]
+
+    # corrupt the required fraction of rows with a left-right phase angle
+    # asymmetry larger than the accepted one (a typical electrode issue)
+    invalid = rng.random(n) >= valid_rate
+    if invalid.any():
+        m = int(invalid.sum())
+        pha = _phaseangle(
+            data["left_body_resistance"][invalid],
+            data["left_body_reactance"][invalid],
+        )
+        shift = rng.uniform(2.0, 4.0, m) * rng.choice([-1.0, 1.0], m)
+        pha = np.where(pha + shift < 0.5, pha + np.abs(shift), pha + shift)
+        res = data["right_body_resistance"][invalid]
+        rea = np.round(res * np.tan(np.radians(pha)), 1)
+        data["right_body_reactance"][invalid] = rea
+    return {i: data[i] for i in INPUT_FIELDS}
+
+
+def _convert(data: dict[str, np.ndarray], output: str):
+    """return the generated columns in the required format"""
+    if output == "dict":
+        return data
+    if output == "dataframe":
+        return pd.DataFrame(data, copy=False)
+    if output == "arrow":
+        import pyarrow as pa
+
+        return pa.table(data)
+    import polars as pl
+
+    return pl.DataFrame(
+        {i: v.astype(str) if i == "gender" else v for i, v in data.items()}
+    )
+
+
+def synthetic_population(
+    n: int,
+    seed: int | np.random.SeedSequence | None = None,
+    valid_rate: float = 0.95,
+    male_rate: float = 0.5,
+    age_range: tuple[int, int] = (18, 80),
+    output: Literal["dataframe", "dict", "arrow", "polars"] = "dataframe",
+):
+    """
+    generate a seeded synthetic population of measurements in vectorized
+    form.
+
+    Heights depend on gender and age, weights follow a body mass index
+    growing with age, resistance indices increase in women and with the
+    body mass index, phase angles decrease with age and the right side
+    mirrors the left one with small deviations. Segment readings are drawn
+    as fractions of the body readings of the same side.
+
+    Parameters
+    ----------
+    n: int
+        the number of measurements
+
+    seed: int | np.random.SeedSequence | None = None
+        the seed of the random generator. The same seed always returns the
+        same population.
+
+    valid_rate: float = 0.95
+        the expected fraction of rows passing is_valid (for every
+        methodology). The other rows have a left-right phase angle
+        asymmetry exceeding the accepted one.
+
+    male_rate: float = 0.5
+        the expected fraction of males
+
+    age_range: tuple[int, int] = (18, 80)
+        the minimum and maximum age in years
+
+    output: Literal["dataframe", "dict", "arrow", "polars"] = "dataframe"
+        the output format: a pandas DataFrame, a dict of numpy arrays, a
+        pyarrow Table or a polars DataFrame. All of them are accepted by
+        score_batch.
+
+    Returns
+    -------
+    population: pd.DataFrame | dict[str, np.ndarray] | pyarrow.Table | polars.DataFrame
+        the measurements, with one column per CheckupBIA input argument
+    """
+    if output not in _OUTPUTS:
+        raise ValueError(f"output must be one of {list(_OUTPUTS)}")
+    if not 0 <= valid_rate <= 1 or not 0 <= male_rate <= 1:
+        raise ValueError("valid_rate and male_rate must be within [0, 1]")
+    rng = np.random.default_rng(seed)
+    data = _generate(rng, int(n), valid_rate, male_rate, tuple(age_range))
+    return _convert(data, output)
+
+
+def synthetic_chunks(
+    n: int,
+    chunk_size: int = 100000,
+    seed: int | None = None,
+    **kwargs,
+) -> Iterator:
+    """
+    generate a synthetic population of n measurements chunk by chunk, so
+    that populations larger than the memory can be streamed (e.g. into
+    compare_methods or CohortSummary). Each chunk has its own seed spawned
+    from seed, hence the chunks are reproducible. The other arguments are
+    passed to synthetic_population.
+    """
+    n_chunks = -(-int(n) // chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    for i, chunk_seed in enumerate(seeds):
+        size = min(chunk_size, n - i * chunk_size)
+        yield synthetic_population(size, seed=chunk_seed, **kwargs)
@@ -0,0 +1,277 @@
+"""
+module dedicated to the tuning of the batch parameters on the current host
+
+tune() benchmarks the Inbody inference and the equation engine over a grid
+of chunk sizes, onnxruntime threads, executor threads and worker processes
+and saves the fastest configuration as json. The three inference values were
+measured together, hence they are applied together: the BatchExecutor
+objects created afterwards use them as defaults and batch Inbody predictions
+(e.g. score_batch) go through a tuned executor (see tuned_executor). The
+number of processes is used by score_batch (and thus by CohortSummary and
+rescore) to split large batches over a pool of worker processes.
+"""
+
+#! IMPORTS
+
+
+import json
+import os
+import platform
+from datetime import datetime, timezone
+from os.path import dirname, exists, expanduser, join
+from threading import Lock
+from time import perf_counter
+
+__all__ = ["TUNING_PATH", "TUNING_DEFAULTS", "load_tuning", "tune"]
+
+
+#! CONSTANTS
+
+
+# the file storing the tuned configuration
+TUNING_PATH = os.environ.get(
+    "CHECKUPY_TUNING",
+    join(
+        os.environ.get("XDG_CONFIG_HOME", expanduser(join("~", ".config"))),
+        "checkupy",
+        "tuning.json",
+    ),
+)
+
+# the values used when no tuned configuration is available
+TUNING_DEFAULTS = {
+    "chunk_size": 1024,
+    "intra_op_num_threads": None,
+    "max_workers": None,
+    "processes": 1,
+}
+
+# relative slowdown accepted to prefer configurations using fewer resources
+_TOLERANCE = 0.05
+
+# loaded configurations as {path: (modification time, configuration)}
+_CACHE: dict[str, tuple[float, dict]] = {}
+_CACHE_LOCK = Lock()
+
+
+#! FUNCTIONS
+
+
+def load_tuning(path: str | None = None):
+    """
+    return the tuned configuration, falling back to TUNING_DEFAULTS for
+    the values not available. The file is read again only when modified.
+
+    Parameters
+    ----------
+    path: str | None = None
+        the configuration file. If None, TUNING_PATH is used.
+
+    Returns
+    -------
+    config: dict
+        the chunk_size, intra_op_num_threads, max_workers and processes
+        values.
+    """
+    path = TUNING_PATH if path is None else path
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return dict(TUNING_DEFAULTS)
+    with _CACHE_LOCK:
+        cached = _CACHE.get(path)
+        if cached is None or cached[0] != mtime:
+            try:
+                with open(path, "r") as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                stored = {}
+            values = {i: stored.get(i, v) for i, v in TUNING_DEFAULTS.items()}
+            _CACHE[path] = cached = (mtime, values)
+    return dict(cached[1])
+
+
+def _is_tuned(path: str | None = None):
+    """return True if a tuned configuration is available"""
+    return exists(TUNING_PATH if path is None else path)
+
+
+def _grid(maximum: int):
+    """return the powers of 2 up to maximum (always including maximum)"""
+    out = [1]
+    while out[-1] * 2 <= maximum:
+        out.append(out[-1] * 2)
+    if out[-1] != maximum:
+        out.append(maximum)
+    return out
+
+
+def _best_time(func, repeat: int):
+    """return the minimum time of repeated calls of func"""
+    func()  # warm-up call
+    times = []
+    for _ in range(repeat):
+        tic = perf_counter()
+        func()
+        times.append(perf_counter() - tic)
+    return min(times)
+
+
+def _fastest(results: list[dict], cost):
+    """
+    return the cheapest result (according to cost) whose wall time is
+    within _TOLERANCE of the best one, so that timing noise does not select
+    more threads or processes than needed
+    """
+    best = min(i["wall_time"] for i in results)
+    candidates = [i for i in results if i["wall_time"] <= best * (1 + _TOLERANCE)]
+    return min(candidates, key=lambda x: (cost(x), x["wall_time"]))
+
+
+def _tune_inference(
+    rows: int,
+    chunk_sizes: list[int],
+    threads: list[int],
+    workers: list[int],
+    repeat: int,
+):
+    """benchmark the Inbody inference over the grid"""
+    import numpy as np
+
+    from .checkupy import Inbody
+    from .onnx_models import BatchExecutor, OnnxModel
+
+    rng = np.random.default_rng(0)
+    data = rng.uniform(1, 100, (rows, len(Inbody._input_labels)))
+    data = data.astype(np.float32)
+    results = []
+    for n_threads in threads:
+        model = OnnxModel(
+            model_path=Inbody._model_path,
+            input_labels=Inbody._input_labels,
+            output_labels=Inbody._output_labels,
+            intra_op_num_threads=n_threads,
+        )
+        for chunk_size in chunk_sizes:
+            for n_workers in workers:
+                executor = BatchExecutor(model, chunk_size, n_workers)
+                wall = _best_time(lambda: executor.predict(data), repeat)
+                results.append(
+                    dict(
+                        intra_op_num_threads=n_threads,
+                        chunk_size=chunk_size,
+                        max_workers=n_workers,
+                        wall_time=wall,
+                        throughput=rows / wall,
+                    )
+                )
+    return results
+
+
+def _tune_processes(rows: int, processes: list[int], repeat: int):
+    """
+    benchmark the equation engine of score_batch over the number of
+    processes. The batch is large enough to use all of them.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from .batch import _PROCESS_MIN_ROWS, score_batch
+    from .checkupy import _SAMPLE
+
+    rows = max(rows, max(processes) * _PROCESS_MIN_ROWS)
+    data = pd.DataFrame({i: np.repeat(v, rows) for i, v in _SAMPLE.items()})
+    methods = ("fitness", "standard")
+    results = []
+    for n_proc in processes:
+        wall = _best_time(
+            lambda: score_batch(data, methods=methods, processes=n_proc),
+            repeat,
+        )
+        results.append(dict(processes=n_proc, wall_time=wall, throughput=rows / wall))
+    return results
+
+
+def tune(
+    rows: int = 16384,
+    chunk_sizes: list[int] | tuple[int, ...] = (256, 1024, 4096, 16384),
+    threads: list[int] | tuple[int, ...] | None = None,
+    workers: list[int] | tuple[int, ...] | None = None,
+    processes: list[int] | tuple[int, ...] | None = None,
+    repeat: int = 3,
+    path: str | None = None,
+    save: bool = True,
+):
+    """
+    benchmark the batch computations on the current host and save the
+    fastest configuration.
+
+    Parameters
+    ----------
+    rows: int = 16384
+        the number of rows of the benchmark batches
+
+    chunk_sizes: list[int] | tuple[int, ...] = (256, 1024, 4096, 16384)
+        the BatchExecutor chunk sizes to be tested
+
+    threads: list[int] | tuple[int, ...] | None = None
+        the onnxruntime intra-op thread counts to be tested. If None, the
+        powers of 2 up to the number of cpus are used.
+
+    workers: list[int] | tuple[int, ...] | None = None
+        the BatchExecutor thread counts to be tested. If None, the powers
+        of 2 up to the number of cpus are used.
+
+    processes: list[int] | tuple[int, ...] | None = None
+        the worker process counts to be tested on the equation engine. If
+        None, the powers of 2 up to the number of cpus are used.
+
+    repeat: int = 3
+        the number of timed runs of each configuration (the best is kept)
+
+    path: str | None = None
+        the configuration file. If None, TUNING_PATH is used.
+
+    save: bool = True
+        if True, the configuration is written to path
+
+    Returns
+    -------
+    config: dict
+        the best chunk_size, intra_op_num_threads, max_workers and
+        processes, together with the host description and the time of each
+        tested configuration.
+    """
+    cpus = os.cpu_count() or 1
+    threads = list(threads or _grid(cpus))
+    workers = list(workers or _grid(cpus))
+    processes = list(processes or _grid(cpus))
+    if min([*chunk_sizes, *threads, *workers, *processes, rows, repeat]) < 1:
+        raise ValueError("all the tuning values must be positive integers")
+
+    inference = _tune_inference(rows, list(chunk_sizes), threads, workers, repeat)
+    equations = _tune_processes(rows, processes, repeat)
+    best = _fastest(
+        inference, lambda x: x["intra_op_num_threads"] * x["max_workers"]
+    )
+    best_proc = _fastest(equations, lambda x: x["processes"])
+    config = dict(
+        chunk_size=best["chunk_size"],
+        intra_op_num_threads=best["intra_op_num_threads"],
+        max_workers=best["max_workers"],
+        processes=best_proc["processes"],
+        host=platform.node(),
+        machine=platform.machine(),
+        cpu_count=cpus,
+        rows=rows,
+        created=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        inference=inference,
+        equations=equations,
+    )
+    if save:
+        path = TUNING_PATH if path is None else path
+        if dirname(path) != "" and not exists(dirname(path)):
+            os.makedirs(dirname(path))
+        with open(path, "w") as f:
+            json.dump(config, f, indent=4)
+    return config
@@ -0,0 +1,124 @@
+"""module dedicated to the Monte Carlo estimation of the measures uncertainty"""
+
+#! IMPORTS
+
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .batch import INPUT_FIELDS, score_batch
+from .checkupy import CheckupBIA
+
+__all__ = ["ELECTRICAL_FIELDS", "uncertainty"]
+
+
+#! CONSTANTS
+
+
+# the electrical readings of the analyzer
+ELECTRICAL_FIELDS = tuple(
+    i for i in INPUT_FIELDS if i.endswith("_resistance") or i.endswith("_reactance")
+)
+
+
+#! FUNCTIONS
+
+
+def uncertainty(
+    measurement: dict | pd.Series,
+    noise: dict[str, float] | None = None,
+    relative: bool = True,
+    n_samples: int = 1000,
+    percentiles: list[float] | tuple[float, ...] = (2.5, 50, 97.5),
+    methods: str | list[str] | tuple[str, ...] = CheckupBIA._available_methods,
+    fields: str | list[str] | None = None,
+    corrected_electrical_values: bool = False,
+    seed: int | None = None,
+):
+    """
+    estimate the uncertainty of the measures of a single subject by
+    perturbing its inputs with gaussian noise. All the perturbed samples are
+    scored in one batched pass through the equations and the Inbody model.
+
+    Parameters
+    ----------
+    measurement: dict | pd.Series
+        the subject inputs, named as the CheckupBIA arguments
+
+    noise: dict[str, float] | None = None
+        the standard deviation of the noise applied to each input (inputs
+        not included are not perturbed). If None, a 1% relative noise is
+        applied to all the electrical readings.
+
+    relative: bool = True
+        if True, the noise values are fractions of the measured values,
+        otherwise they are expressed in the units of each input.
+
+    n_samples: int = 1000
+        the number of perturbed samples
+
+    percentiles: list[float] | tuple[float, ...] = (2.5, 50, 97.5)
+        the percentiles (in the 0-100 range) to be returned
+
+    methods: str | list[str] | tuple[str, ...] = ("fitness", "standard", "inbody")
+        the methodologies to be used
+
+    fields: str | list[str] | None = None
+        the measures to be returned. If None, all the available measures
+        are returned.
+
+    corrected_electrical_values: bool = False
+        are the electrical data corrected for orthostatism?
+
+    seed: int | None = None
+        the seed of the random generator
+
+    Returns
+    -------
+    bands: pd.DataFrame
+        the requested percentiles (columns) of each numeric measure, indexed
+        by (methodology, measure).
+    """
+    if n_samples < 1:
+        raise ValueError("n_samples must be a positive integer")
+    # the inputs not required by the methodologies (e.g. the trunk readings
+    # for inbody) may be missing: score_batch checks the required ones
+    available = [i for i in INPUT_FIELDS if i in measurement]
+    if noise is None:
+        noise = {i: 0.01 for i in ELECTRICAL_FIELDS if i in available}
+        relative = True
+    unknown = [i for i in noise if i not in INPUT_FIELDS or i == "gender"]
+    if len(unknown) > 0:
+        raise ValueError(f"Noise cannot be applied to: {unknown}")
+    missing = [i for i in noise if i not in available]
+    if len(missing) > 0:
+        raise ValueError(f"Noise applied to missing inputs: {missing}")
+
+    # generate the perturbed samples. Integer inputs (height and age) are
+    # rounded, as they would be truncated downwards otherwise
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for i in available:
+        value = measurement[i]
+        if i in noise:
+            std = noise[i] * abs(value) if relative else noise[i]
+            samples[i] = value + rng.normal(0, std, n_samples)
+            if i in ("height", "age"):
+                samples[i] = np.round(samples[i])
+        else:
+            samples[i] = np.repeat(value, n_samples)
+
+    # score all the samples at once and get the percentiles
+    scores = score_batch(
+        data=samples,
+        methods=methods,
+        fields=fields,
+        corrected_electrical_values=corrected_electrical_values,
+    )
+    scores = scores.select_dtypes("number")
+    with warnings.catch_warnings():  # measures not available are all NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        values = np.nanpercentile(scores.values.astype(float), percentiles, axis=0)
+    return pd.DataFrame(values.T, index=scores.columns, columns=list(percentiles))
@@ -0,0 +1,499 @@
+"""
+module dedicated to the versioning of the measures and to the incremental
+re-scoring of stored results
+
+Each measure of each methodology has a fingerprint: a hash of the code of
+the property computing it (docstrings and formatting excluded) and,
+recursively, of the code, the coefficients and the orthostatic correction
+betas it depends on. Inbody measures relying on the model predictions
+include the hash of the onnx file as well. Stored results record these
+fingerprints in a json sidecar file, so that after an update of the
+equations only the measures whose fingerprint changed are computed again.
+Stored measures no longer defined by their methodology are left unchanged
+(with a warning), as they cannot be computed anymore.
+"""
+
+#! IMPORTS
+
+
+import ast
+import hashlib
+import inspect
+import json
+import textwrap
+import warnings
+from functools import lru_cache
+from os.path import exists
+
+import pandas as pd
+
+from .batch import score_batch
+from .checkupy import BIAInput, CheckupBIA, Fitness, Inbody, Standard
+from .registry import default_registry
+
+__all__ = [
+    "fingerprints",
+    "versions_path",
+    "save_versions",
+    "load_versions",
+    "stale_measures",
+    "rescore",
+    "rescore_file",
+]
+
+
+#! CONSTANTS
+
+
+_CLASSES = dict(fitness=Fitness, standard=Standard, inbody=Inbody)
+
+# the electrical inputs (those having orthostatic correction betas)
+_INPUTS = tuple(
+    i[1:-6] for i in dir(BIAInput) if i.startswith("_") and i.endswith("_betas")
+)
+
+# the methods implementing the orthostatic correction
+_CORRECTION = ("apply_orthostatic_correction", "remove_orthostatic_correction")
+
+
+#! FUNCTIONS
+
+
+def _removed(columns):
+    """
+    return the (methodology, measure) columns that are no longer defined by
+    the current methodologies
+    """
+    return [
+        (m, i)
+        for m, i in columns
+        if m not in _CLASSES or i not in _CLASSES[m].measures()
+    ]
+
+
+def _digest(*parts: str):
+    """return the sha256 hex digest of the given strings"""
+    out = hashlib.sha256()
+    for i in parts:
+        out.update(i.encode())
+        out.update(b"\0")
+    return out.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _file_digest(path: str):
+    """return the sha256 hex digest of a file content"""
+    out = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            out.update(block)
+    return out.hexdigest()
+
+
+def _function(obj):
+    """return the function implementing a class attribute, if any"""
+    if isinstance(obj, property):
+        return obj.fget
+    if isinstance(obj, (classmethod, staticmethod)):
+        return obj.__func__
+    if inspect.isfunction(obj):
+        return obj
+    return None
+
+
+@lru_cache(maxsize=None)
+def _parse(func):
+    """
+    return the normalized code of a function (its AST without docstrings),
+    the names of the attributes of self or cls it reads (special attributes
+    excluded) and whether it also reads attributes whose names are built at
+    runtime (e.g. getattr(self, f"{side}_body_resistance")), and the
+    (method, key) pairs of the calls of methods of self with a string
+    constant as first argument (e.g. self._linear("total_body_water"))
+    """
+    tree = ast.parse(textwrap.dedent(inspect.getsource(func)))
+    for node in ast.walk(tree):
+        body = getattr(node, "body", None)
+        if (
+            isinstance(body, list)
+            and len(body) > 0
+            and isinstance(body[0], ast.Expr)
+            and isinstance(body[0].value, ast.Constant)
+            and isinstance(body[0].value.value, str)
+        ):
+            node.body = body[1:] or [ast.Pass()]  # type: ignore
+    names = set()
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.Attribute)
+            and isinstance(node.ctx, ast.Load)
+            and isinstance(node.value, ast.Name)
+            and node.value.id in ("self", "cls")
+            and not node.attr.startswith("__")
+        ):
+            names.add(node.attr)
+    dynamic = False
+    calls = set()
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id in ("self", "cls")
+            and len(node.args) > 0
+            and isinstance(node.args[0], ast.Constant)
+            and isinstance(node.args[0].value, str)
+        ):
+            calls.add((node.func.attr, node.args[0].value))
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id in ("getattr", "hasattr")
+            and len(node.args) > 1
+            and isinstance(node.args[0], ast.Name)
+            and node.args[0].id in ("self", "cls")
+        ):
+            name = node.args[1]
+            if isinstance(name, ast.Constant) and isinstance(name.value, str):
+                names.add(name.value)
+            else:
+                dynamic = True
+    code = ast.dump(tree, include_attributes=False)
+    return code, tuple(sorted(names)), dynamic, tuple(sorted(calls))
+
+
+def _model_spec(inbody_model: str | None):
+    """return the onnx file and the labels used by the Inbody methodology"""
+    if inbody_model is None:
+        labels = (Inbody._input_labels, Inbody._output_labels)
+        return Inbody._model_path, repr(labels)
+    spec = default_registry._specs[default_registry._key(inbody_model, None)]
+    labels = (spec["input_labels"], spec["output_labels"])
+    return spec["model_path"], repr(labels)
+
+
+def _fingerprints(method: str, corrected: bool, model: tuple[str, str] | None):
+    """return the fingerprint of each measure of a methodology"""
+    cls = _CLASSES[method]
+
+    # the stored electrical data are corrected (standard) or uncorrected
+    # (the others) by means of the betas unless already in the required form
+    uses_betas = method == "standard" or corrected
+    memo: dict[str, str] = {}
+
+    # the coefficient tables are versioned entry by entry, where used
+    tables = getattr(cls, "_coefficient_tables", {})
+
+    def fingerprint(name: str, stack: tuple[str, ...]) -> str:
+        if name in memo:
+            return memo[name]
+        if name in stack:  # recursive reference
+            return name
+        obj = inspect.getattr_static(cls, name, None)
+        func = _function(obj)
+        if func is None:
+            if name in tables.values():
+                value = _digest("table")
+            elif name == "_preds" and model is not None:
+                value = _digest("model", _file_digest(model[0]), model[1])
+            else:
+                value = _digest("value", repr(obj))
+            memo[name] = value
+            return value
+        code, deps, dynamic, calls = _parse(func)
+
+        # the correction reads the betas of all the inputs, while each input
+        # already depends on its own betas: only its code is considered
+        if name in _CORRECTION:
+            memo[name] = value = _digest(code)
+            return value
+
+        # the attributes read dynamically cannot be resolved: the function is
+        # conservatively considered dependent on all the electrical inputs
+        if dynamic:
+            deps = tuple(sorted(set(deps).union(_INPUTS)))
+        parts = [code]
+        for dep in deps:
+            parts.append(f"{dep}={fingerprint(dep, stack + (name,))}")
+        for method, key in calls:
+            if method in tables:
+                entry = getattr(cls, tables[method]).get(key)
+                parts.append(f"{tables[method]}[{key}]={repr(entry)}")
+        betas = f"_{name}_betas"
+        if uses_betas and hasattr(BIAInput, betas):
+            parts.append(f"{betas}={repr(getattr(cls, betas))}")
+            parts += [f"{i}={fingerprint(i, stack + (name,))}" for i in _CORRECTION]
+        memo[name] = value = _digest(*parts)
+        return value
+
+    return {i: fingerprint(i, ())[:16] for i in cls.measures()}
+
+
+def fingerprints(
+    methods: str | list[str] | tuple[str, ...] = CheckupBIA._available_methods,
+    corrected_electrical_values: bool = False,
+    inbody_model: str | None = None,
+):
+    """
+    return the fingerprint of each measure of the given methodologies
+
+    Parameters
+    ----------
+    methods: str | list[str] | tuple[str, ...] = ("fitness", "standard", "inbody")
+        the methodologies
+
+    corrected_electrical_values: bool = False
+        are the electrical data corrected for orthostatism?
+
+    inbody_model: str | None = None
+        the key of the Inbody model in the default registry
+
+    Returns
+    -------
+    fingerprints: dict[str, dict[str, str]]
+        the fingerprint of each measure of each methodology
+    """
+    if isinstance(methods, str):
+        methods = [methods]
+    out = {}
+    for method in methods:
+        model = _model_spec(inbody_model) if method == "inbody" else None
+        out[method] = dict(
+            _fingerprints(method, bool(corrected_electrical_values), model)
+        )
+    return out
+
+
+def _read_results(path: str):
+    """read stored results from a csv or parquet file"""
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(
+        path, header=[0, 1], index_col=0, float_precision="round_trip"
+    )
+
+
+def _read_data(path: str):
+    """
+    read measurements from a json file (as the run.py input: one record, a
+    list of records or a dict of columns), a parquet file or a csv file
+    """
+    if path.endswith(".json"):
+        with open(path, "r") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and all(map(pd.api.types.is_scalar, data.values())):
+            data = [data]
+        return pd.DataFrame(data)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def _write_table(table: pd.DataFrame, path: str):
+    """write a csv or parquet file"""
+    if path.endswith(".parquet"):
+        table.to_parquet(path)
+    else:
+        table.to_csv(path)
+
+
+def versions_path(path: str):
+    """return the path of the versions sidecar file of a results file"""
+    return f"{path}.versions.json"
+
+
+def save_versions(
+    path: str,
+    scores: pd.DataFrame,
+    corrected_electrical_values: bool = False,
+    inbody_model: str | None = None,
+):
+    """
+    write the versions sidecar file of the results stored in path
+
+    Parameters
+    ----------
+    path: str
+        the path of the stored results (the sidecar is written next to it)
+
+    scores: pd.DataFrame
+        the stored results, with (methodology, measure) columns as returned
+        by score_batch
+
+    corrected_electrical_values: bool = False
+        were the electrical data corrected for orthostatism?
+
+    inbody_model: str | None = None
+        the key of the Inbody model used
+
+    Returns
+    -------
+    versions: dict
+        the content of the sidecar file
+    """
+    removed = _removed(scores.columns)
+    columns = [i for i in scores.columns if i not in removed]
+    methods = list(dict.fromkeys(i[0] for i in columns))
+    prints = fingerprints(methods, corrected_electrical_values, inbody_model)
+    versions = dict(
+        corrected_electrical_values=bool(corrected_electrical_values),
+        inbody_model=inbody_model,
+        fingerprints={
+            method: {i: prints[method][i] for m, i in columns if m == method}
+            for method in methods
+        },
+    )
+    with open(versions_path(path), "w") as f:
+        json.dump(versions, f, indent=4)
+    return versions
+
+
+def load_versions(path: str):
+    """
+    return the content of the versions sidecar file of the results stored
+    in path, or None if not available
+    """
+    sidecar = versions_path(path)
+    if not exists(sidecar):
+        return None
+    with open(sidecar, "r") as f:
+        return json.load(f)
+
+
+def stale_measures(versions: dict):
+    """
+    return the stored measures whose current fingerprint differs from the
+    recorded one. The measures no longer defined by their methodology are
+    not included, as they cannot be computed again.
+
+    Parameters
+    ----------
+    versions: dict
+        the content of a versions sidecar file
+
+    Returns
+    -------
+    stale: dict[str, list[str]]
+        the outdated measures of each methodology
+    """
+    recorded = versions["fingerprints"]
+    recorded = {i: v for i, v in recorded.items() if i in _CLASSES}
+    current = fingerprints(
+        list(recorded.keys()),
+        versions["corrected_electrical_values"],
+        versions.get("inbody_model"),
+    )
+    out = {}
+    for method, measures in recorded.items():
+        stale = [
+            i
+            for i, v in measures.items()
+            if i in current[method] and current[method][i] != v
+        ]
+        if len(stale) > 0:
+            out[method] = stale
+    return out
+
+
+def rescore(
+    data,
+    scores: pd.DataFrame,
+    versions: dict | None = None,
+):
+    """
+    compute again only the outdated measures of stored results
+
+    Parameters
+    ----------
+    data: pd.DataFrame | dict | pyarrow.Table | pyarrow.RecordBatch | polars.DataFrame
+        the measurements the results were computed from (same rows, in the
+        same order)
+
+    scores: pd.DataFrame
+        the stored results, with (methodology, measure) columns
+
+    versions: dict | None = None
+        the content of the versions sidecar file of the results. If None,
+        all the measures are considered outdated.
+
+    Returns
+    -------
+    scores: pd.DataFrame
+        the results with the outdated columns replaced. The columns of the
+        measures no longer defined by their methodology are left unchanged
+        and reported with a warning.
+
+    updated: list[tuple[str, str]]
+        the (methodology, measure) columns computed again
+    """
+    corrected = False if versions is None else versions["corrected_electrical_values"]
+    model = None if versions is None else versions.get("inbody_model")
+    removed = _removed(scores.columns)
+    if len(removed) > 0:
+        warnings.warn(
+            "measures no longer available, left unchanged: "
+            + ", ".join(f"{m}.{i}" for m, i in removed),
+            stacklevel=2,
+        )
+    if versions is None:
+        stale = {}
+        for method, measure in scores.columns:
+            if (method, measure) not in removed:
+                stale.setdefault(method, []).append(measure)
+    else:
+        stale = stale_measures(versions)
+    if len(stale) == 0:
+        return scores, []
+
+    fields = list(dict.fromkeys(i for v in stale.values() for i in v))
+    fresh = score_batch(
+        data,
+        methods=tuple(stale.keys()),
+        fields=fields,
+        corrected_electrical_values=corrected,
+        inbody_model=model,
+    )
+    if len(fresh) != len(scores):
+        raise ValueError("data and scores must have the same number of rows")
+    updated = [(m, i) for m, v in stale.items() for i in v]
+    scores = scores.copy()
+    for column in updated:
+        scores[column] = fresh[column].to_numpy()
+    return scores, updated
+
+
+def rescore_file(results_path: str, data_path: str):
+    """
+    update stored results after a change of the equations or of the model,
+    rewriting only the outdated columns and the versions sidecar file
+
+    Parameters
+    ----------
+    results_path: str
+        the csv or parquet file with the results, as written by score_batch
+        (one column per methodology and measure)
+
+    data_path: str
+        the json, csv or parquet file with the measurements the results were
+        computed from
+
+    Returns
+    -------
+    updated: list[tuple[str, str]]
+        the (methodology, measure) columns computed again
+    """
+    versions = load_versions(results_path)
+    scores = _read_results(results_path)
+    scores, updated = rescore(_read_data(data_path), scores, versions)
+    if len(updated) > 0:
+        _write_table(scores, results_path)
+    if versions is None:
+        save_versions(results_path, scores)
+    elif len(updated) > 0:
+        save_versions(
+            results_path,
+            scores,
+            versions["corrected_electrical_values"],
+            versions.get("inbody_model"),
+        )
+    return updated
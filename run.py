@@ -1,24 +1,97 @@
 import argparse
 import json
-import pandas as pd
-from checkupy.checkupy import CheckupBIA
+import os
+import socket
+import sys
+import tempfile
 
+# heavy modules (pandas, onnxruntime, checkupy) are imported only when the
+# computation runs in this process, so that forwarding to the daemon is fast
+DEFAULT_SOCKET = os.environ.get(
+    "CHECKUPY_SOCKET",
+    os.path.join(
+        tempfile.gettempdir(),
+        f"checkupy-{os.getuid()}.sock" if hasattr(os, "getuid") else "checkupy.sock",
+    ),
+)
 
-def run_bia(params, output_file=None):
-    bia = CheckupBIA(**params)
-    out = []
-    for i, v in bia.to_dict().items():
-        line = pd.DataFrame(pd.Series(v)).T
-        line.index = pd.Index([i])
-        out.append(line)
-    out = pd.concat(out).T
+# seconds waited for the daemon to connect and answer before computing in
+# this process
+DAEMON_TIMEOUT = float(os.environ.get("CHECKUPY_DAEMON_TIMEOUT", 10))
+
+
+def _daemon_failed(socket_path, reason):
+    """report a daemon not answering properly, returning None"""
+    print(
+        f"checkupy daemon on {socket_path} failed ({reason}), computing in process",
+        file=sys.stderr,
+    )
+    return None
+
+
+def forward_to_daemon(request, socket_path=DEFAULT_SOCKET):
+    """
+    send the request to the daemon and return its output, or None if no
+    daemon can be reached on socket_path (or Unix domain sockets are not
+    available on this platform). A daemon that does not answer within
+    DAEMON_TIMEOUT seconds, or whose answer is not valid, is reported on
+    stderr and None is returned as well.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(DAEMON_TIMEOUT)
+    try:
+        client.connect(socket_path)
+    except OSError:  # no daemon, socket of another user, timeout, ...
+        client.close()
+        return None
+    try:
+        with client, client.makefile("rwb") as stream:
+            stream.write((json.dumps(request) + "\n").encode())
+            stream.flush()
+            line = stream.readline()
+    except OSError as exc:  # timeout, daemon gone while answering, ...
+        return _daemon_failed(socket_path, str(exc) or type(exc).__name__)
+    try:
+        response = json.loads(line)
+        ok = response["ok"]
+        output = response["output"] if ok else response["error"]
+    except (ValueError, TypeError, KeyError):
+        return _daemon_failed(socket_path, "malformed answer" if line else "no answer")
+    if not ok:
+        raise SystemExit(output)
+    return output
+
+
+def run_bia(
+    params,
+    output_file=None,
+    fields=None,
+    methods=None,
+    socket_path=DEFAULT_SOCKET,
+    use_daemon=True,
+):
+    request = dict(
+        params=params,
+        fields=fields,
+        methods=methods,
+        format="csv" if output_file else "table",
+    )
+    out = forward_to_daemon(request, socket_path) if use_daemon else None
+    if out is None:
+        from checkupy.daemon import results_frame
+
+        frame = results_frame(params, fields, methods)
+        out = frame.to_csv() if output_file else frame.to_string(index=True)
 
     if output_file:
-        out.to_csv(output_file)
+        with open(output_file, "w", newline="") as f:
+            f.write(out)
         print(f"Results saved to {output_file}")
     else:
         print("\nBIA Results:\n")
-        print(out.to_string(index=True))
+        print(out)
 
 
 def main():
@@ -27,6 +100,63 @@ def main():
     )
     parser.add_argument("--json", type=str, help="Path to JSON file with parameters")
     parser.add_argument("--output", type=str, help="Output CSV file name (optional)")
+    parser.add_argument(
+        "--fields",
+        type=str,
+        nargs="+",
+        help="Measures to be computed (optional, all if not provided)",
+    )
+    parser.add_argument(
+        "--methods",
+        type=str,
+        nargs="+",
+        choices=["fitness", "standard", "inbody"],
+        help="Methodologies to be used (optional, all if not provided)",
+    )
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="Load the model and exercise the code paths before computing",
+    )
+    parser.add_argument(
+        "--tune",
+        action="store_true",
+        help="Benchmark batch sizes and thread/process counts on this host "
+        + "and save the fastest configuration used by the next batch runs",
+    )
+    parser.add_argument(
+        "--rescore",
+        type=str,
+        metavar="RESULTS",
+        help="Update the outdated measures of a csv/parquet results file "
+        + "computed from the --data measurements",
+    )
+    parser.add_argument(
+        "--data",
+        type=str,
+        help="json/csv/parquet file with the measurements of --rescore",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a daemon serving the next run.py calls on --socket",
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=DEFAULT_SOCKET,
+        help=f"Unix domain socket of the daemon (default: {DEFAULT_SOCKET})",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="With --serve, expose Prometheus metrics on this local port",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Always compute in this process, even if a daemon is running",
+    )
 
     # Add individual parameters for command-line input
     parser.add_argument("--height", type=int)
@@ -59,10 +189,74 @@ def main():
         params = {
             k: v
             for k, v in vars(args).items()
-            if k not in ["json", "output"] and v is not None
+            if k
+            not in [
+                "json",
+                "output",
+                "fields",
+                "methods",
+                "warmup",
+                "tune",
+                "rescore",
+                "data",
+                "serve",
+                "socket",
+                "no_daemon",
+                "metrics_port",
+            ]
+            and v is not None
         }
 
-    run_bia(params, args.output)
+    if args.tune:
+        from checkupy.tuning import TUNING_PATH, tune
+
+        config = tune()
+        print(f"Tuned configuration saved to {TUNING_PATH}")
+        for k in ["chunk_size", "intra_op_num_threads", "max_workers", "processes"]:
+            print(f"  {k}: {config[k]}")
+        if len(params) == 0:
+            return
+
+    if args.rescore:
+        if not args.data:
+            parser.error("--rescore requires --data")
+        from checkupy.versioning import rescore_file
+
+        updated = rescore_file(args.rescore, args.data)
+        print(f"{len(updated)} columns updated in {args.rescore}")
+        for method, measure in updated:
+            print(f"  {method}: {measure}")
+        return
+
+    if args.serve:
+        if not hasattr(socket, "AF_UNIX"):
+            parser.error("--serve requires Unix domain sockets")
+        from checkupy.daemon import serve
+
+        print(f"Serving on {args.socket}")
+        serve(args.socket, metrics_port=args.metrics_port)
+        return
+
+    if args.warmup:
+        from checkupy.checkupy import warmup
+
+        methods = args.methods or ["fitness", "standard", "inbody"]
+        report = warmup(methods=methods)
+        print(f"Warm-up completed in {report['total']:.3f} s")
+        for k, v in report.items():
+            if k != "total":
+                print(f"  {k}: {v:.4f} s")
+        if len(params) == 0:
+            return
+
+    run_bia(
+        params,
+        args.output,
+        args.fields,
+        args.methods,
+        socket_path=args.socket,
+        use_daemon=not args.no_daemon,
+    )
 
 
 if __name__ == "__main__":